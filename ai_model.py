@@ -1,20 +1,483 @@
 # ai_model.py
+import json
 import os
+import random
+import re
+import threading
+import time
+from collections import deque
 import google.generativeai as genai
-import streamlit as st
 
-# Configure the Gemini API using Streamlit's secrets
-genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
+from cache import content_hash
+from config import get_setting
+from instrumentation import metrics
+from parsing import ANALYSIS_SCHEMA, StreamingObjectParser, extract_json, missing_fields_prompt, validate_analysis
 
-# Function to get the structured response from Gemini
-def get_gemini_response(input_prompt, resume_text, job_description):
-    """Generates a structured response from the Gemini API."""
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
-            f"""{input_prompt}\n\nResume: {resume_text}\n\nJob Description: {job_description}"""
-        )
+# Rough characters-per-token ratio for Gemini on English prose
+CHARS_PER_TOKEN = 4
+# Default per-request token budget for the assembled prompt (None = no limit)
+DEFAULT_TOKEN_BUDGET = get_setting("PROMPT_TOKEN_BUDGET", cast=int)
+TRIM_MARKER = "\n[... {count} characters trimmed to fit the token budget ...]\n"
+
+# Keys every analysis object must carry, shared by the single and batched prompts.
+# The score and highlights come first so they can be shown while the rest streams in.
+ANALYSIS_FIELDS = """
+    - "overall_score": An integer score out of 100 for the resume's suitability.
+    - "summary_highlights": A concise 3-4 line explanation of the overall score.
+    - "strengths": A list of strings detailing the resume's key strengths.
+    - "weaknesses": A list of strings detailing the resume's key weaknesses.
+    - "suggestions": A list of strings with actionable advice for the candidate to improve their resume.
+    - "found_skills": A list of skills from the job description that were found on the resume.
+    - "missing_skills": A list of strings of the top 5 missing skills from the resume that are present in the job description."""
+
+# Prompt template for scoring one resume
+ANALYSIS_PROMPT = """
+    You are an experienced HR Manager. Your task is to compare the provided resume with the job description.
+    You will provide a detailed analysis in a structured JSON format. Your response MUST contain ONLY the JSON object and no other text.
+    The JSON object should have the following keys:""" + ANALYSIS_FIELDS + """
+    The resume and the job description follow below.
+    """
+
+# Prompt template for scoring several resumes in one request
+BATCH_ANALYSIS_PROMPT = """
+    You are an experienced HR Manager. Your task is to compare each of the provided resumes with the job description, independently of the others.
+    Your response MUST contain ONLY a JSON array and no other text, with exactly one object per candidate in the order given.
+    Each object must have a "candidate_id" key copied from the candidate's heading, plus the following keys:""" + ANALYSIS_FIELDS + """
+    The job description and the candidates' resumes follow below.
+    """
+# Version of the analysis prompts used in cache keys. Both prompts ask for the same
+# fields and scoring, so an analysis from either path is treated as equivalent and
+# shares one cache entry; editing either prompt changes every key.
+ANALYSIS_PROMPT_VERSION = content_hash("analysis-prompts", ANALYSIS_PROMPT, BATCH_ANALYSIS_PROMPT)
+
+# Function to estimate the token count of a piece of text
+def estimate_tokens(text):
+    """Approximates the number of tokens Gemini will bill for `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+# Function to compact and, if needed, shorten a document
+def fit_document(text, max_tokens=None):
+    """Collapses redundant whitespace and trims `text` to about `max_tokens` tokens.
+
+    Trimming keeps the start of the document (contact details, summary, recent roles)
+    and a shorter tail (education, certifications), dropping the middle.
+    """
+    text = re.sub(r"[ \t\f\v]+", " ", text or "")
+    text = re.sub(r"\s*\n\s*", "\n", text).strip()
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN - len(TRIM_MARKER) - 8)
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    trimmed = len(text) - head - tail
+    return text[:head] + TRIM_MARKER.format(count=trimmed) + (text[-tail:] if tail else "")
+
+# Function to assemble the final prompt from instructions and documents
+def build_prompt(instructions, documents, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Joins the instructions with each (label, text) document exactly once.
+
+    Empty documents are skipped. With a `token_budget`, the tokens left after the
+    instructions are shared between the documents, and shorter documents hand their
+    unused share to longer ones.
+    """
+    instructions = instructions.strip()
+    documents = [(label, text) for label, text in documents if text]
+    budgets = {}
+    if token_budget is not None and documents:
+        remaining = token_budget - estimate_tokens(instructions)
+        by_size = sorted(range(len(documents)), key=lambda i: len(documents[i][1]))
+        for position, i in enumerate(by_size):
+            label, text = documents[i]
+            share = max(0, remaining // (len(documents) - position))
+            budgets[i] = share - estimate_tokens(f"\n\n{label}:\n")
+            remaining -= min(share, estimate_tokens(text) + estimate_tokens(f"\n\n{label}:\n"))
+    sections = [instructions]
+    for i, (label, text) in enumerate(documents):
+        sections.append(f"{label}:\n{fit_document(text, budgets.get(i))}")
+    return "\n\n".join(sections)
+
+# --- Gemini client: backends, rate limiting, retries and metrics ---
+DEFAULT_MODEL = 'gemini-1.5-flash'
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = 1_000_000
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_REQUEST_TIMEOUT = 120
+
+
+class GeminiError(Exception):
+    """Raised when a Gemini request fails for good (non-retryable or out of retries)."""
+
+
+class TransientBackendError(Exception):
+    """Retryable failure raised by FakeBackend."""
+
+
+class GeminiBackend:
+    """Real Gemini backend. The model object (and its transport) is built once and reused.
+
+    The API key defaults to the GOOGLE_API_KEY setting (environment or Streamlit secrets).
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, timeout=DEFAULT_REQUEST_TIMEOUT, api_key=None):
+        api_key = api_key or get_setting("GOOGLE_API_KEY")
+        if not api_key:
+            raise GeminiError("GOOGLE_API_KEY is not set (environment variable or .streamlit/secrets.toml).")
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.timeout = timeout
+
+    def generate(self, prompt):
+        response = self.model.generate_content(prompt, request_options={"timeout": self.timeout})
         return response.text
-    except Exception as e:
-        st.error(f"Error generating content from Gemini: {e}")
-        return ""
\ No newline at end of file
+
+    def generate_stream(self, prompt):
+        """Yields the response text chunk by chunk as Gemini produces it."""
+        response = self.model.generate_content(prompt, stream=True, request_options={"timeout": self.timeout})
+        for chunk in response:
+            yield chunk.text
+
+    def is_retryable(self, error):
+        from google.api_core import exceptions as google_exceptions
+        retryable = (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.TooManyRequests,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError,
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.GatewayTimeout,
+            TimeoutError,
+            ConnectionError,
+        )
+        return isinstance(error, retryable)
+
+
+class FakeBackend:
+    """Local stand-in for Gemini used by tests and load benchmarks.
+
+    `responder(prompt)` builds the reply text; `failure_rate` is the chance that a
+    call raises a retryable TransientBackendError instead. Streamed replies arrive
+    in `chunk_size` pieces, `chunk_delay` seconds apart.
+    """
+
+    def __init__(self, responder=None, latency=0.0, failure_rate=0.0, seed=None, chunk_size=64, chunk_delay=0.0):
+        self.responder = responder or (lambda prompt: '{"overall_score": 50, "summary_highlights": "fake"}')
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise TransientBackendError("simulated 429 / timeout")
+        return self.responder(prompt)
+
+    def generate_stream(self, prompt):
+        text = self.generate(prompt)
+        for start in range(0, len(text), self.chunk_size):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+
+    def is_retryable(self, error):
+        return isinstance(error, (TransientBackendError, TimeoutError, ConnectionError))
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`.
+
+    The default burst capacity is six seconds of traffic, so a large batch is
+    spread over the minute instead of hitting the quota all at once.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, rate_per_minute / 10)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Blocks until `amount` tokens are available. Returns the seconds spent waiting."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits applied together."""
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens):
+        waited = 0.0
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
+
+
+class GeminiClient:
+    """Long-lived client: one backend, rate limiting, jittered exponential backoff and metrics."""
+
+    def __init__(self, backend, rate_limiter=None, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=1.0, max_delay=30.0, history=1000):
+        self.backend = backend
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = deque(maxlen=history)
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rate_limited_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt` (1-based): exponential with equal jitter."""
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def generate(self, prompt, on_chunk=None):
+        """Sends `prompt` and returns the response text, retrying transient errors.
+
+        With `on_chunk`, the response is streamed and `on_chunk(text)` is called for
+        each piece as it arrives. Before a retry, `on_chunk(None)` tells the caller to
+        discard what it received from the failed attempt.
+        """
+        start = time.perf_counter()
+        attempts = 0
+        waited = 0.0
+        while True:
+            attempts += 1
+            if self.rate_limiter:
+                waited += self.rate_limiter.acquire(estimate_tokens(prompt))
+            try:
+                if on_chunk is None:
+                    text = self.backend.generate(prompt)
+                else:
+                    if attempts > 1:
+                        on_chunk(None)
+                    text = "".join(self._stream(prompt, on_chunk))
+                self._record(start, attempts, waited, ok=True)
+                return text
+            except Exception as e:
+                if attempts > self.max_retries or not self.backend.is_retryable(e):
+                    self._record(start, attempts, waited, ok=False)
+                    raise GeminiError(f"{type(e).__name__}: {e}") from e
+                metrics.incr("retries", label="gemini")
+                time.sleep(self.backoff(attempts))
+
+    def _stream(self, prompt, on_chunk):
+        for chunk in self.backend.generate_stream(prompt):
+            on_chunk(chunk)
+            yield chunk
+
+    def _record(self, start, attempts, waited, ok):
+        with self._lock:
+            self.calls.append({"latency": time.perf_counter() - start, "attempts": attempts, "ok": ok})
+            self.counters["calls"] += 1
+            self.counters["retries"] += attempts - 1
+            self.counters["rate_limited_seconds"] += waited
+            if not ok:
+                self.counters["failures"] += 1
+
+    def metrics(self):
+        """Counters plus p50/p95 latency over the most recent calls."""
+        with self._lock:
+            latencies = sorted(call["latency"] for call in self.calls)
+            summary = dict(self.counters)
+        if latencies:
+            summary["p50_latency"] = latencies[len(latencies) // 2]
+            summary["p95_latency"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return summary
+
+
+_client = None
+_client_lock = threading.Lock()
+
+# Function to get the shared Gemini client, built once per process
+def get_client():
+    """Returns the process-wide GeminiClient configured from the environment or Streamlit's secrets."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient(
+                GeminiBackend(get_setting("GEMINI_MODEL", DEFAULT_MODEL)),
+                RateLimiter(
+                    get_setting("GEMINI_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE, cast=int),
+                    get_setting("GEMINI_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE, cast=int),
+                ),
+                max_retries=get_setting("GEMINI_MAX_RETRIES", DEFAULT_MAX_RETRIES, cast=int),
+            )
+        return _client
+
+def set_client(client):
+    """Replaces the shared client, e.g. with one wrapping FakeBackend."""
+    global _client
+    with _client_lock:
+        _client = client
+
+# Function to send a prompt through the shared client, timed and costed under `stage`
+def generate_timed(prompt, stage="gemini", on_chunk=None):
+    with metrics.span(stage):
+        text = get_client().generate(prompt, on_chunk=on_chunk)
+    metrics.record_llm_call(stage, estimate_tokens(prompt), estimate_tokens(text or ""))
+    return text
+
+# Function to get the structured response from Gemini
+def get_gemini_response(input_prompt, resume_text="", job_description="", token_budget=DEFAULT_TOKEN_BUDGET,
+                        on_chunk=None, stage="gemini"):
+    """Generates a structured response from the Gemini API.
+
+    `input_prompt` holds only the instructions; the resume and job description are
+    appended once each by `build_prompt`. Pass `on_chunk` to stream the response
+    (see GeminiClient.generate). The call is timed and its estimated tokens and cost
+    are recorded under `stage`. Raises GeminiError if the request fails.
+    """
+    prompt = build_prompt(input_prompt, [("Resume", resume_text), ("Job Description", job_description)], token_budget)
+    return generate_timed(prompt, stage, on_chunk)
+
+# Function to analyze one resume, streaming fields as they arrive
+def get_analysis(resume_text, job_description, on_field=None, token_budget=DEFAULT_TOKEN_BUDGET, max_reasks=1):
+    """Returns the validated analysis dict for one resume.
+
+    With `on_field`, the response is streamed and `on_field(name, value)` is called
+    as soon as each top-level field is complete, so the score and highlights can be
+    shown before the rest arrives. Fields that are missing or invalid after bounded
+    repair are requested again on their own (up to `max_reasks` times) instead of
+    re-running the whole analysis; a failed re-ask keeps the partial answer.
+
+    Fields still missing after that are filled with empty values and listed under
+    "missing_fields". When no score can be recovered at all, returns the old
+    {"overall_score": 0, "raw_response": ...} fallback.
+    """
+    state = {"parser": StreamingObjectParser()}
+
+    def on_chunk(chunk):
+        if chunk is None:
+            state["parser"] = StreamingObjectParser()
+            return
+        for field, value in state["parser"].feed(chunk).items():
+            on_field(field, value)
+
+    response_text = get_gemini_response(ANALYSIS_PROMPT, resume_text, job_description, token_budget,
+                                        on_chunk=on_chunk if on_field else None)
+    if not response_text:
+        return None
+    with metrics.span("json_parse"):
+        if not on_field:
+            state["parser"].feed(response_text)
+        analysis, missing = validate_analysis(state["parser"].result())
+    reasks = 0
+    # Re-asking for everything would be a full re-run; only patch partial answers
+    while missing and len(missing) < len(ANALYSIS_SCHEMA) and reasks < max_reasks:
+        reasks += 1
+        try:
+            reply = get_gemini_response(missing_fields_prompt(missing), resume_text, job_description, token_budget,
+                                        stage="gemini_reask")
+        except GeminiError:
+            # Keep the partial first answer; the fields are filled in as missing below
+            break
+        patch = extract_json(reply) or {}
+        patch = {field: value for field, value in patch.items() if field in missing}
+        analysis, missing = validate_analysis(dict(analysis, **patch))
+        if on_field:
+            for field in patch:
+                if field in analysis:
+                    on_field(field, analysis[field])
+    if "overall_score" in missing:
+        return {"overall_score": 0, "raw_response": response_text}
+    if missing:
+        for field in missing:
+            analysis[field] = "" if ANALYSIS_SCHEMA[field] is str else []
+        analysis["missing_fields"] = missing
+    return analysis
+
+# --- Batched prompting: several resumes and one copy of the JD per request ---
+# Gemini 1.5 Flash limits: input context window and maximum output tokens
+DEFAULT_CONTEXT_TOKENS = 1_048_576
+DEFAULT_OUTPUT_TOKENS = 8192
+# Expected output size of one candidate's analysis object
+OUTPUT_TOKENS_PER_CANDIDATE = 700
+DEFAULT_MAX_BATCH_SIZE = 10
+
+# Function to group resumes into batches that fit the model's limits
+def plan_batches(resume_texts, job_description, context_tokens=DEFAULT_CONTEXT_TOKENS,
+                 output_tokens=DEFAULT_OUTPUT_TOKENS, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 token_budget=DEFAULT_TOKEN_BUDGET):
+    """Returns lists of indexes into `resume_texts`, one list per request.
+
+    A batch closes when the next resume would overflow the input context (with the
+    JD and instructions counted once) or the output limit (one analysis object per
+    candidate), or when it reaches `max_batch_size`.
+    """
+    per_output = max(1, output_tokens // OUTPUT_TOKENS_PER_CANDIDATE)
+    max_size = max(1, min(max_batch_size, per_output))
+    fixed = estimate_tokens(BATCH_ANALYSIS_PROMPT) + estimate_tokens(fit_document(job_description, token_budget))
+    batches, current, used = [], [], fixed
+    for i, text in enumerate(resume_texts):
+        cost = estimate_tokens(fit_document(text, token_budget)) + 16
+        if current and (len(current) >= max_size or used + cost > context_tokens):
+            batches.append(current)
+            current, used = [], fixed
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+# Function to decode every complete JSON object found in a (possibly broken) array
+def iter_json_objects(text):
+    """Yields each top-level JSON object in `text`, skipping anything that fails to decode."""
+    decoder = json.JSONDecoder()
+    position = text.find("{")
+    while position != -1:
+        try:
+            value, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position = text.find("{", position + 1)
+            continue
+        if isinstance(value, dict):
+            yield value
+        position = text.find("{", end)
+
+# Function to analyze several resumes against one JD in a single request
+def get_batched_analyses(resume_texts, job_description, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Sends all `resume_texts` in one request and returns one analysis per resume.
+
+    Entries that are missing or fail schema validation come back as None, so the
+    caller can fall back to a single-resume request for just those candidates.
+    """
+    documents = [("Job Description", job_description)]
+    documents += [(f"Candidate c{i + 1}", text) for i, text in enumerate(resume_texts)]
+    budget = None
+    if token_budget is not None:
+        budget = token_budget * len(resume_texts)
+    response_text = generate_timed(build_prompt(BATCH_ANALYSIS_PROMPT, documents, budget), "gemini_batch")
+    by_id = {}
+    with metrics.span("json_parse"):
+        for entry in iter_json_objects(response_text):
+            candidate_id = str(entry.pop("candidate_id", "")).strip().lower()
+            entry, missing = validate_analysis(entry)
+            if candidate_id and not missing:
+                by_id.setdefault(candidate_id, entry)
+    return [by_id.get(f"c{i + 1}") for i in range(len(resume_texts))]
@@ -2,15 +2,27 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 import json
-import re
+import os
+import threading
 from supabase import create_client, Client
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # --- THIS MUST BE THE FIRST STREAMLIT COMMAND ---
 st.set_page_config(layout="wide", page_title="AI Resume Analyzer")
 
 # Import functions from your new utility and AI files
-from utils import get_pdf_text, get_job_description_skills
-from ai_model import get_gemini_response
+from utils import get_pdf_text, prefetch_pdf_texts
+from prescreen import select_candidates
+from ai_model import get_analysis, get_batched_analyses, get_client, plan_batches, GeminiError, ANALYSIS_PROMPT_VERSION
+from batch import run_batch, BatchResult, DEFAULT_MAX_CONCURRENCY, MAX_CONCURRENCY_LIMIT
+from cache import AnalysisCache, SupabaseTier, analysis_cache_key, content_hash, DEFAULT_CACHE_PATH, DEFAULT_DISK_ENTRIES, DEFAULT_TTL_SECONDS
+from embeddings import EmbeddingIndex, make_embedder
+from results import ResultsIndex
+from history import CACHE_KEY_COLUMN, fetch_history_page, has_column
+from persistence import WriteBehindWriter
+from parsing import EARLY_FIELDS
+from instrumentation import metrics
+from jd_profiles import JobProfileStore, profile_cache
 
 # --- Supabase Connection and Session State Initialization ---
 @st.cache_resource
@@ -25,6 +37,81 @@ def init_connection():
 
 supabase = init_connection()
 
+# Cache keys are stored with each history row only once the cache_key column migration has run
+@st.cache_resource
+def init_store_cache_keys():
+    settings = st.secrets.get("persistence", {})
+    return bool(supabase) and settings.get("store_cache_keys", True) and has_column(supabase, CACHE_KEY_COLUMN)
+
+store_cache_keys = init_store_cache_keys()
+history_extra_columns = [CACHE_KEY_COLUMN] if store_cache_keys else []
+
+# Results cache keyed on (resume bytes, JD text, prompt template) content hashes
+@st.cache_resource
+def init_cache():
+    settings = st.secrets.get("cache", {})
+    remote = SupabaseTier(supabase) if store_cache_keys and settings.get("persist_to_supabase", False) else None
+    return AnalysisCache(
+        path=settings.get("path", DEFAULT_CACHE_PATH),
+        ttl=settings.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+        disk_entries=settings.get("max_entries", DEFAULT_DISK_ENTRIES),
+        remote=remote,
+    )
+
+analysis_cache = init_cache()
+
+# Job-description profiles (skills, condensed requirements, skill matcher), stored beside the analysis cache
+@st.cache_resource
+def init_profile_store():
+    settings = st.secrets.get("cache", {})
+    return JobProfileStore(cache=profile_cache(
+        settings.get("path", DEFAULT_CACHE_PATH),
+        ttl=settings.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+    ))
+
+profile_store = init_profile_store()
+
+# Background writer that bulk-inserts analysis rows off the analysis threads
+@st.cache_resource
+def init_history_writer():
+    settings = st.secrets.get("persistence", {})
+    return WriteBehindWriter(
+        supabase,
+        batch_size=settings.get("batch_size", 50),
+        dedupe_job_descriptions=settings.get("dedupe_job_descriptions", False),
+    )
+
+history_writer = init_history_writer() if supabase else None
+
+# Per-user embedding index over every resume in analysis_history
+@st.cache_resource
+def init_talent_index(username):
+    settings = st.secrets.get("embeddings", {})
+    embedder = make_embedder(settings.get("backend", "hashing"))
+    directory = settings.get("dir", os.path.join(".cache", "embeddings"))
+    return EmbeddingIndex(embedder, os.path.join(directory, content_hash(username)[:16]))
+
+def sync_talent_index(index, username, page_size=500):
+    """Embeds history rows added since the last sync (keyset pagination on `id`)."""
+    last_id = index.meta.get('last_row_id', 0)
+    labels = index.meta.setdefault('labels', {})
+    added = 0
+    while True:
+        rows = supabase.table('analysis_history').select('id, filename, resume_text') \
+            .eq('username', username).gt('id', last_id).order('id').limit(page_size).execute().data
+        if not rows:
+            break
+        # Ids are content hashes, so the same resume screened twice is indexed once
+        ids = [content_hash(row.get('resume_text') or '') for row in rows]
+        index.add(ids, [row.get('resume_text') or '' for row in rows])
+        labels.update({id_: row['filename'] for id_, row in zip(ids, rows)})
+        last_id = rows[-1]['id']
+        added += len(rows)
+    if added:
+        index.meta['last_row_id'] = last_id
+        index.save()
+    return added
+
 # Initialize session state
 if 'history' not in st.session_state:
     st.session_state.history = []
@@ -34,6 +121,14 @@ if 'user' not in st.session_state:
     st.session_state.user = None
 if 'show_login' not in st.session_state:
     st.session_state.show_login = True
+if 'results_index' not in st.session_state:
+    st.session_state.results_index = ResultsIndex()
+if 'history_before_id' not in st.session_state:
+    st.session_state.history_before_id = None
+if 'batch_mark' not in st.session_state:
+    st.session_state.batch_mark = None
+if 'upload_keys' not in st.session_state:
+    st.session_state.upload_keys = {}
 
 # --- Main Page Login & Registration UI ---
 def show_login_page():
@@ -62,8 +157,15 @@ def show_login_page():
                         if response.data and response.data[0]['password_hash'] == password:
                             st.session_state.user = username
                             st.success(f"Welcome back, {username}!")
-                            history_response = supabase.table('analysis_history').select('*').eq('username', username).execute()
-                            st.session_state.history = history_response.data if history_response.data else []
+                            # Only the newest page of history is loaded; older pages load on demand
+                            try:
+                                history, before_id = fetch_history_page(supabase, username, extra_columns=history_extra_columns)
+                            except Exception as e:
+                                # Still log in; the history can be reloaded once the database is reachable
+                                st.warning(f"Could not load your analysis history: {e}")
+                                history, before_id = [], None
+                            st.session_state.history = history
+                            st.session_state.history_before_id = before_id
                             st.rerun()
                         else:
                             st.error("Invalid username or password.")
@@ -91,8 +193,154 @@ def show_login_page():
                     else:
                         st.warning("Could not connect to the database. Please check your credentials.")
 
+# Bar chart of candidate scores, memoized on the (name, score, coverage) rows
+@st.cache_data(max_entries=32)
+def build_score_chart(rows):
+    df_scores = pd.DataFrame(rows, columns=['Candidate', 'Score', 'Skill Coverage'])
+    return alt.Chart(df_scores).mark_bar().encode(
+        x=alt.X('Score', title='Overall Score'),
+        y=alt.Y('Candidate', sort='-x', title='Candidate'),
+        tooltip=['Candidate', 'Score', 'Skill Coverage']
+    ).properties(
+        width=600
+    )
+
+# Sidebar breakdown of where the last batch spent its time and tokens
+def show_performance_panel(mark):
+    if mark is None:
+        st.caption("Run an analysis to see per-stage timings.")
+        return
+    stages = metrics.stage_summary(since=mark)
+    if stages:
+        st.dataframe(pd.DataFrame([
+            {'Stage': stage, 'Count': s['count'], 'p50 (ms)': round(s['p50'] * 1000, 1),
+             'p95 (ms)': round(s['p95'] * 1000, 1), 'Total (s)': round(s['total'], 2)}
+            for stage, s in stages.items()
+        ]), hide_index=True, use_container_width=True)
+    st.caption(
+        f"Gemini: {metrics.counter_total('llm_calls', mark):.0f} calls, "
+        f"~{metrics.counter_total('llm_input_tokens', mark):,.0f} input / "
+        f"{metrics.counter_total('llm_output_tokens', mark):,.0f} output tokens, "
+        f"~${metrics.counter_total('llm_cost_usd', mark):.4f}"
+    )
+    counters = metrics.counters(since=mark)
+    misses = counters.get(('cache_lookups', 'analysis:misses'), 0)
+    hits = sum(value for (name, label), value in counters.items()
+               if name == 'cache_lookups' and label.startswith('analysis:')) - misses
+    st.caption(
+        f"Cache: {hits:.0f} hits / {misses:.0f} misses · Retries: "
+        f"{counters.get(('retries', 'gemini'), 0):.0f} Gemini, {counters.get(('retries', 'db'), 0):.0f} database"
+    )
+    st.download_button("Export metrics (Prometheus)", metrics.prometheus(), file_name="metrics.prom", mime="text/plain")
+
+# --- Per-resume analysis (runs on batch worker threads) ---
+def analyze_resume(file, job_description, username, cache_key, skill_coverage=None, on_field=None, prompt_job_description=None,
+                   resume_text=None):
+    """Extracts, analyzes and stores a single resume. Returns the history entry or None.
+
+    `on_field(name, value)` receives each analysis field as it streams in.
+    `prompt_job_description` (e.g. the condensed requirements) is sent to Gemini in
+    place of `job_description`, which is still what gets saved. `resume_text` is the
+    already extracted text, if any.
+    """
+    prepared = prepare_resume(file, cache_key, skill_coverage, resume_text)
+    if prepared is None:
+        return None
+    if prepared['analysis'] is None:
+        prepared['analysis'] = get_analysis(prepared['resume_text'], prompt_job_description or job_description, on_field=on_field)
+    return store_analysis(prepared, job_description, username)
+
+def prepare_resume(file, cache_key, skill_coverage=None, resume_text=None):
+    """Extracts the resume text (unless given) and looks up a cached analysis for it."""
+    if resume_text is None:
+        resume_text = get_pdf_text(file, on_error=st.error)
+    if not resume_text:
+        return None
+    analysis = analysis_cache.get(cache_key)
+    return {'file': file, 'cache_key': cache_key, 'resume_text': resume_text, 'analysis': analysis,
+            'cached': analysis is not None, 'skill_coverage': skill_coverage}
+
+def store_analysis(prepared, job_description, username):
+    """Caches and saves a finished analysis. Returns the history entry or None."""
+    analysis = prepared['analysis']
+    if analysis is None:
+        return None
+    if not prepared['cached'] and 'raw_response' not in analysis and 'missing_fields' not in analysis:
+        analysis_cache.set(prepared['cache_key'], analysis)
+    if prepared.get('skill_coverage') is not None:
+        analysis = dict(analysis, skill_coverage=prepared['skill_coverage'])
+    row = {
+        'username': username,
+        'filename': prepared['file'].name,
+        'job_description': job_description,
+        'resume_text': prepared['resume_text'],
+        'analysis_result': json.dumps(analysis)
+    }
+    if store_cache_keys:
+        row['cache_key'] = prepared['cache_key']
+    history_writer.enqueue(row)
+    return {'filename': prepared['file'].name, 'cache_key': prepared['cache_key'], 'analysis_result': json.dumps(analysis)}
+
+def analyze_resumes_batched(group, job_description):
+    """Analyzes a group of prepared resumes with one Gemini request.
+
+    Candidates missing from the batched reply fall back to a single-resume request.
+    """
+    try:
+        analyses = get_batched_analyses([p['resume_text'] for p in group], job_description)
+    except GeminiError:
+        analyses = [None] * len(group)
+    for prepared, analysis in zip(group, analyses):
+        if analysis is None:
+            try:
+                analysis = get_analysis(prepared['resume_text'], job_description)
+            except GeminiError as e:
+                prepared['error'] = e
+        prepared['analysis'] = analysis
+    return group
+
+def analyze_files_batched(files, job_description, username, cache_keys, skill_coverages, max_concurrency, on_progress, initializer,
+                          prompt_job_description=None, resume_texts=None):
+    """Batched-prompting path: extract every file, send cache misses to Gemini several
+    per request (one copy of the JD each), then store. Returns per-file results in input order."""
+    prompt_job_description = prompt_job_description or job_description
+    resume_texts = resume_texts or {}
+    prepared = run_batch(files, lambda file: prepare_resume(file, cache_keys[file.file_id], skill_coverages.get(file.file_id),
+                                                            resume_texts.get(file.file_id)),
+                         max_concurrency=max_concurrency, initializer=initializer)
+    misses = [r.value for r in prepared if r.ok and r.value is not None and r.value['analysis'] is None]
+    groups = [[misses[i] for i in group] for group in plan_batches([p['resume_text'] for p in misses], prompt_job_description)]
+    progress = {'done': len(files) - len(misses)}
+
+    def report_group(done, total, result):
+        for p in result.item:
+            progress['done'] += 1
+            on_progress(progress['done'], len(files), BatchResult(0, p['file']))
+
+    group_results = run_batch(groups, lambda group: analyze_resumes_batched(group, prompt_job_description),
+                              max_concurrency=max_concurrency, on_progress=report_group, initializer=initializer)
+    group_errors = {id(p): r.error for r in group_results if not r.ok for p in r.item}
+    group_errors.update({id(p): p['error'] for p in misses if 'error' in p})
+    to_store = [r.value for r in prepared if r.ok and r.value is not None and id(r.value) not in group_errors]
+    stored = run_batch(to_store, lambda p: store_analysis(p, job_description, username),
+                       max_concurrency=max_concurrency, initializer=initializer)
+    stored_by_id = {id(r.item): r for r in stored}
+
+    results = []
+    for r in prepared:
+        if r.ok and r.value is not None:
+            error = group_errors.get(id(r.value))
+            if error is not None:
+                r = BatchResult(r.index, r.item, error=error)
+            else:
+                s = stored_by_id[id(r.value)]
+                r = BatchResult(r.index, r.item, value=s.value, error=s.error)
+        results.append(r)
+    return results
+
 # --- Main Application UI (Hidden until login) ---
 def show_main_app():
+    results_index = st.session_state.results_index.sync(st.session_state.history)
     # --- Sidebar Content ---
     with st.sidebar:
         st.header("Navigation")
@@ -116,26 +364,70 @@ def show_main_app():
             placeholder="Select skills..."
         )
 
+        st.header("Settings")
+        max_concurrency = st.slider(
+            "Resumes analyzed in parallel",
+            1, MAX_CONCURRENCY_LIMIT, DEFAULT_MAX_CONCURRENCY,
+            help="Higher values finish large batches faster but may hit Gemini rate limits."
+        )
+        min_coverage = st.slider(
+            "Pre-screen: minimum skill coverage (%)",
+            0, 100, 0,
+            help="Resumes matching fewer of the job's skills than this are not sent to Gemini."
+        )
+        top_k = st.number_input(
+            "Pre-screen: send only the top K resumes (0 = all)",
+            min_value=0, value=0, step=1
+        )
+        batch_prompting = st.checkbox(
+            "Batch several resumes per request",
+            help="Sends multiple resumes with a single copy of the job description in one Gemini call."
+        )
+        condensed_jd = st.checkbox(
+            "Send condensed job requirements",
+            value=True,
+            help="Sends a short summary of the job's requirements with each resume instead of the full posting."
+        )
+        st.caption(f"Analysis cache: {analysis_cache.hits} hits / {analysis_cache.misses} misses")
+        gemini_metrics = get_client().metrics()
+        st.caption(
+            f"Gemini: {gemini_metrics['calls']} calls, {gemini_metrics['retries']} retries, "
+            f"{gemini_metrics['failures']} failures, p95 {gemini_metrics.get('p95_latency', 0):.1f}s"
+        )
+
+        st.header("Performance")
+        # Filled at the end of the run so it reflects a batch started on this rerun
+        performance_panel = st.container()
+
         st.header("Analysis History")
         if st.session_state.user and st.session_state.history:
             if st.button("Clear History"):
                 st.session_state.history = []
                 st.session_state.job_skills = []
+                st.session_state.history_before_id = None
                 st.rerun()
-            for result in reversed(st.session_state.history):
-                with st.expander(f"📚 {result.get('filename')} (Score: {result.get('overall_score', 'N/A')})"):
-                    analysis_result = result.get('analysis_result')
-                    if isinstance(analysis_result, str):
-                        try:
-                            analysis_result = json.loads(analysis_result)
-                        except json.JSONDecodeError:
-                            analysis_result = {}
+            for result, analysis_result in reversed(results_index.parsed_history()):
+                analysis_result = analysis_result or {}
+                with st.expander(f"📚 {result.get('filename')} (Score: {analysis_result.get('overall_score', 'N/A')})"):
                     if 'raw_response' in analysis_result:
                         st.warning("Failed to parse this entry.")
                         st.markdown(analysis_result['raw_response'])
                     else:
                         st.markdown(f"**Overall Score:** {analysis_result.get('overall_score', 0)}/100")
                         st.markdown(f"**Explanation:** {analysis_result.get('summary_highlights', 'No explanation provided.')}")
+            if st.session_state.history_before_id is not None and supabase:
+                if st.button("Load older history"):
+                    try:
+                        older, before_id = fetch_history_page(
+                            supabase, st.session_state.user, st.session_state.history_before_id,
+                            extra_columns=history_extra_columns,
+                        )
+                    except Exception as e:
+                        st.warning(f"Could not load older history: {e}")
+                    else:
+                        st.session_state.history = older + st.session_state.history
+                        st.session_state.history_before_id = before_id
+                        st.rerun()
         else:
             st.info("No analysis history yet.")
 
@@ -155,106 +447,164 @@ def show_main_app():
         uploaded_files = st.file_uploader("Upload Resumes (PDF)", type=["pdf"], accept_multiple_files=True, help="Select one or more resumes to analyze.")
         if st.button("Analyze Resumes"):
             if uploaded_files and job_description:
-                st.session_state.job_skills = get_job_description_skills(job_description)
+                st.session_state.batch_mark = metrics.mark()
+                # Skills, condensed requirements and matcher are computed once per posting
+                profile = profile_store.get(job_description, on_error=st.error)
+                st.session_state.job_skills = profile.skills
+                prompt_job_description = profile.prompt_text(job_description) if condensed_jd else job_description
+                analyzed_keys = {r.get('cache_key') for r in st.session_state.history}
+                # Results are shown by content key, so same-named files and re-screens under a new JD stay apart
+                st.session_state.upload_keys = {
+                    file.file_id: analysis_cache_key(file.getvalue(), prompt_job_description, ANALYSIS_PROMPT_VERSION)
+                    for file in uploaded_files
+                }
+                cache_keys = {}
+                pending_files = []
+                for file in uploaded_files:
+                    key = st.session_state.upload_keys[file.file_id]
+                    if key not in analyzed_keys:
+                        analyzed_keys.add(key)
+                        cache_keys[file.file_id] = key
+                        pending_files.append(file)
+                progress_bar = st.progress(0.0, text="Analyzing resumes...")
+
+                def report_progress(done, total, result):
+                    progress_bar.progress(done / total, text=f"Analyzed {done}/{total}: {result.item.name}")
+
+                # Score and highlights stream in from the worker threads and are redrawn here
+                live_view = st.empty()
+                live_fields = {}
+                live_lock = threading.Lock()
+                live_drawn = {'count': 0}
+
+                def stream_fields(file):
+                    def on_field(field, value):
+                        if field in EARLY_FIELDS:
+                            with live_lock:
+                                live_fields.setdefault(file.file_id, {'name': file.name})[field] = value
+                    return on_field
+
+                def render_live():
+                    with live_lock:
+                        rows = [
+                            {'Candidate': fields['name'], 'Score': fields.get('overall_score'), 'Highlights': fields.get('summary_highlights', '…')}
+                            for fields in live_fields.values()
+                        ]
+                        count = sum(len(fields) - 1 for fields in live_fields.values())
+                    if count != live_drawn['count']:
+                        live_drawn['count'] = count
+                        live_view.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+                ctx = get_script_run_ctx()
+                username = st.session_state.user
+                initializer = lambda: add_script_run_ctx(threading.current_thread(), ctx)
                 with st.spinner("Analyzing resumes..."):
-                    for file in uploaded_files:
-                        try:
-                            if any(r.get('filename') == file.name for r in st.session_state.history):
-                                continue
-                            resume_text = get_pdf_text(file)
-                            if not resume_text:
-                                continue
-                            prompt = f"""
-                            You are an experienced HR Manager. Your task is to compare the provided resume with the job description.
-                            You will provide a detailed analysis in a structured JSON format. Your response MUST contain ONLY the JSON object and no other text.
-                            The JSON object should have the following keys:
-                            - "overall_score": An integer score out of 100 for the resume's suitability.
-                            - "strengths": A list of strings detailing the resume's key strengths.
-                            - "weaknesses": A list of strings detailing the resume's key weaknesses.
-                            - "suggestions": A list of strings with actionable advice for the candidate to improve their resume.
-                            - "found_skills": A list of skills from the job description that were found on the resume.
-                            - "missing_skills": A list of strings of the top 5 missing skills from the resume that are present in the job description.
-                            - "summary_highlights": A concise 3-4 line explanation of the overall score.
-                            Here is the Resume: {resume_text}
-                            Here is the Job Description: {job_description}
-                            """
-                            response_text = get_gemini_response(prompt, resume_text, job_description)
-                            if response_text:
-                                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                                if json_match:
-                                    json_string = json_match.group(0)
-                                else:
-                                    json_string = response_text
-                                try:
-                                    analysis = json.loads(json_string)
-                                    supabase.table('analysis_history').insert({
-                                        'username': st.session_state.user,
-                                        'filename': file.name,
-                                        'job_description': job_description,
-                                        'resume_text': resume_text,
-                                        'analysis_result': json.dumps(analysis)
-                                    }).execute()
-                                    st.session_state.history.append({'filename': file.name, 'analysis_result': json.dumps(analysis)})
-                                except json.JSONDecodeError:
-                                    st.warning(f"Could not parse the JSON response for {file.name}. Displaying raw text.")
-                                    raw_analysis = {
-                                        'overall_score': 0,
-                                        'raw_response': response_text
-                                    }
-                                    supabase.table('analysis_history').insert({
-                                        'username': st.session_state.user,
-                                        'filename': file.name,
-                                        'job_description': job_description,
-                                        'resume_text': resume_text,
-                                        'analysis_result': json.dumps(raw_analysis)
-                                    }).execute()
-                                    st.session_state.history.append({'filename': file.name, 'analysis_result': json.dumps(raw_analysis)})
-                        except Exception as e:
-                            st.error(f"An error occurred with file {file.name}: {e}. Please ensure it's a readable PDF.")
+                    resume_texts = prefetch_pdf_texts(pending_files)
+                    # Local skill-coverage pre-screen decides which resumes reach the LLM
+                    matcher = profile.matcher
+                    coverages = [matcher.score(text)['coverage'] if isinstance(text, str) else 0 for text in resume_texts]
+                    skill_coverages = {file.file_id: coverage for file, coverage in zip(pending_files, coverages)}
+                    # Handed straight to the workers: the text cache is too small to hold a large upload.
+                    # Failed files are extracted again so get_pdf_text can report the error.
+                    prefetched = {file.file_id: text for file, text in zip(pending_files, resume_texts) if isinstance(text, str)}
+                    if matcher.skills and (min_coverage or top_k):
+                        selected = set(select_candidates(coverages, top_k, min_coverage))
+                        screened_out = [f"{file.name} ({coverages[i]}%)" for i, file in enumerate(pending_files) if i not in selected]
+                        pending_files = [file for i, file in enumerate(pending_files) if i in selected]
+                        if screened_out:
+                            st.info(f"Pre-screen skipped {len(screened_out)} resume(s) below the skill-coverage cut: {', '.join(screened_out)}")
+                    if batch_prompting:
+                        results = analyze_files_batched(
+                            pending_files, job_description, username, cache_keys, skill_coverages,
+                            max_concurrency, report_progress, initializer, prompt_job_description, prefetched,
+                        )
+                    else:
+                        results = run_batch(
+                            pending_files,
+                            lambda file: analyze_resume(file, job_description, username, cache_keys[file.file_id],
+                                                        skill_coverages.get(file.file_id), stream_fields(file),
+                                                        prompt_job_description, prefetched.get(file.file_id)),
+                            max_concurrency=max_concurrency,
+                            on_progress=report_progress,
+                            initializer=initializer,
+                            on_tick=render_live,
+                        )
+                # Results come back in upload order, so history stays deterministic
+                for result in results:
+                    file = result.item
+                    if not result.ok:
+                        st.error(f"An error occurred with file {file.name}: {result.error}")
+                        continue
+                    if result.value is None:
+                        continue
+                    stored = json.loads(result.value['analysis_result'])
+                    if 'raw_response' in stored:
+                        st.warning(f"Could not parse the JSON response for {file.name}. Displaying raw text.")
+                    elif stored.get('missing_fields'):
+                        st.warning(f"The analysis for {file.name} is missing: {', '.join(stored['missing_fields'])}.")
+                    st.session_state.history.append(result.value)
+                progress_bar.empty()
+                live_view.empty()
+                failed_before = history_writer.stats['failed']
+                if not history_writer.flush(timeout=30):
+                    st.info(f"{history_writer.pending} result(s) are still being saved in the background.")
+                if history_writer.stats['failed'] > failed_before:
+                    st.warning(f"Could not save {history_writer.stats['failed'] - failed_before} result(s) to the database: {history_writer.last_error}")
             else:
                 st.warning("Please upload at least one PDF resume and enter a job description.")
+    with st.expander("🔎 Rank your talent pool against this job description"):
+        st.markdown("Ranks every resume you have analyzed before by semantic similarity to the job description, without calling Gemini.")
+        shortlist_size = st.number_input("Shortlist size", min_value=1, max_value=500, value=20, step=1)
+        if st.button("Rank Talent Pool"):
+            if job_description and supabase:
+                talent_index = init_talent_index(st.session_state.user)
+                with st.spinner("Updating the talent pool index..."):
+                    sync_talent_index(talent_index, st.session_state.user)
+                matches = talent_index.search([job_description], k=shortlist_size)[0]
+                if matches:
+                    labels = talent_index.meta.get('labels', {})
+                    st.dataframe(
+                        pd.DataFrame([
+                            {'Candidate': labels.get(id_, id_), 'Similarity': round(score, 3)}
+                            for id_, score in matches
+                        ]),
+                        use_container_width=True
+                    )
+                else:
+                    st.info("No stored resumes to rank yet.")
+            else:
+                st.warning("Please enter a job description first.")
     if uploaded_files:
-        current_results = []
+        results_index.sync(st.session_state.history)
+        # Only uploads analyzed against the current JD have keys; the file name is just a label
+        upload_keys = st.session_state.upload_keys
+        current_keys = {upload_keys[file.file_id] for file in uploaded_files if file.file_id in upload_keys}
         for file in uploaded_files:
-            found_result = next((item for item in st.session_state.history if item.get('filename') == file.name), None)
-            if found_result and isinstance(found_result.get('analysis_result'), str):
-                try:
-                    analysis_data = json.loads(found_result['analysis_result'])
-                    analysis_data['filename'] = found_result['filename']
-                    current_results.append(analysis_data)
-                except json.JSONDecodeError:
-                    st.warning(f"Could not parse JSON for {file.name} from history.")
-                    continue
-        if current_results:
-            filtered_results = [
-                res for res in current_results
-                if res.get('overall_score', 0) >= score_range[0] and res.get('overall_score', 0) <= score_range[1]
-            ]
-            if selected_skills:
-                filtered_results = [
-                    res for res in filtered_results
-                    if all(skill in res.get('found_skills', []) for skill in selected_skills)
-                ]
-            sorted_results = sorted(filtered_results, key=lambda x: x.get('overall_score', 0), reverse=True)
+            key = upload_keys.get(file.file_id)
+            if key in results_index.failed and results_index.get(key) is None:
+                st.warning(f"Could not parse JSON for {file.name} from history.")
+        current_keys = {key for key in current_keys if results_index.get(key) is not None}
+        if current_keys:
+            sorted_results = results_index.query(score_range, selected_skills, keys=current_keys)
             st.success("Analysis Complete!")
             st.subheader("Analysis Results (Sorted by Score)")
             st.markdown("*(Use the filters in the sidebar to refine your results)*")
             st.write("---")
             if sorted_results:
                 st.subheader("Candidate Score Ranking")
-                df_scores = pd.DataFrame([
-                    {'Candidate': res['filename'], 'Score': res.get('overall_score', 0)} 
+                chart = build_score_chart(tuple(
+                    (res['filename'], res.get('overall_score', 0), res.get('skill_coverage'))
                     for res in sorted_results
-                ])
-                chart = alt.Chart(df_scores).mark_bar().encode(
-                    x=alt.X('Score', title='Overall Score'),
-                    y=alt.Y('Candidate', sort='-x', title='Candidate'),
-                    tooltip=['Candidate', 'Score']
-                ).properties(
-                    width=600
-                )
+                ))
                 st.altair_chart(chart, use_container_width=True)
-            for result in sorted_results:
+            col_page_size, col_page = st.columns(2)
+            with col_page_size:
+                page_size = st.selectbox("Candidates per page", [10, 25, 50, 100], index=0)
+            page_count = max(1, -(-len(sorted_results) // page_size))
+            with col_page:
+                page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+            page_results = sorted_results[(page - 1) * page_size:page * page_size]
+            for result in page_results:
                 with st.container(border=True):
                     st.header(result['filename'])
                     col_score, col_details = st.columns([1, 2])
@@ -262,6 +612,8 @@ def show_main_app():
                         st.markdown(f"**Overall Score:**")
                         st.progress(result.get('overall_score', 0) / 100)
                         st.subheader(f"{result.get('overall_score', 0)}/100")
+                        if result.get('skill_coverage') is not None:
+                            st.markdown(f"**Skill Coverage:** {result['skill_coverage']}%")
                         st.markdown("---")
                         st.markdown(f"**Highlights:** {result.get('summary_highlights', 'No highlights provided.')}")
                     with col_details:
@@ -317,6 +669,8 @@ def show_main_app():
                     st.info("Highlights:")
                     for item in candidate2.get('summary_highlights', []):
                         st.markdown(f"- {item}")
+    with performance_panel:
+        show_performance_panel(st.session_state.batch_mark)
 
 # --- Main app flow control ---
 if st.session_state.user is None:
@@ -0,0 +1,69 @@
+# batch.py
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+# Default number of resumes analyzed at the same time
+DEFAULT_MAX_CONCURRENCY = 4
+MAX_CONCURRENCY_LIMIT = 32
+# Seconds between `on_tick` calls while items are still running
+DEFAULT_TICK_INTERVAL = 0.25
+
+
+@dataclass
+class BatchResult:
+    """Outcome of running the worker on a single batch item."""
+    index: int
+    item: Any
+    value: Any = None
+    error: Exception = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _run_one(worker, index, item):
+    start = time.perf_counter()
+    try:
+        value = worker(item)
+        return BatchResult(index, item, value=value, elapsed=time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(index, item, error=e, elapsed=time.perf_counter() - start)
+
+
+# Function to run a worker over many items with a bounded thread pool
+def run_batch(items, worker, max_concurrency=DEFAULT_MAX_CONCURRENCY, on_progress=None, initializer=None,
+              on_tick=None, tick_interval=DEFAULT_TICK_INTERVAL):
+    """Runs `worker(item)` for every item using at most `max_concurrency` threads.
+
+    `on_progress(done, total, result)` is called from the calling thread each time
+    an item finishes, in completion order. `on_tick()` is also called from the
+    calling thread every `tick_interval` seconds, e.g. to redraw partial results
+    that workers are streaming in. The returned list is always in input order, so
+    callers can append results deterministically.
+    """
+    items = list(items)
+    total = len(items)
+    results = [None] * total
+    if total == 0:
+        return results
+
+    max_concurrency = max(1, min(int(max_concurrency), MAX_CONCURRENCY_LIMIT, total))
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_concurrency, initializer=initializer) as executor:
+        futures = [executor.submit(_run_one, worker, i, item) for i, item in enumerate(items)]
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=tick_interval if on_tick else None, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                results[result.index] = result
+                done += 1
+                if on_progress:
+                    on_progress(done, total, result)
+            if on_tick:
+                on_tick()
+    return results
@@ -0,0 +1,635 @@
+# benchmark.py
+"""Offline benchmarks for the resume analysis pipeline.
+
+Every benchmark uses local stubs in place of Gemini/Supabase, so it can run
+without API keys. Usage: python benchmark.py <name> [options]
+"""
+import argparse
+import json
+import random
+import time
+
+from batch import run_batch
+
+
+# Local stand-in for get_gemini_response with a fixed, jittered latency
+def stub_gemini_response(latency, jitter=0.1):
+    def respond(input_prompt, resume_text="", job_description=""):
+        time.sleep(latency * random.uniform(1 - jitter, 1 + jitter))
+        return json.dumps({'overall_score': random.randint(0, 100), 'summary_highlights': 'stub'})
+    return respond
+
+
+def bench_batch(args):
+    """Wall-clock time of a batch as the concurrency limit grows."""
+    get_response = stub_gemini_response(args.latency)
+    resumes = [f"resume {i}" for i in range(args.files)]
+
+    def worker(resume_text):
+        return json.loads(get_response("prompt", resume_text, "job description"))
+
+    print(f"{args.files} resumes, ~{args.latency * 1000:.0f} ms per stubbed LLM call")
+    print(f"{'concurrency':>12} {'wall (s)':>10} {'speedup':>8}")
+    baseline = None
+    for concurrency in args.concurrency:
+        start = time.perf_counter()
+        results = run_batch(resumes, worker, max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        assert [r.item for r in results] == resumes
+        baseline = baseline or elapsed
+        print(f"{concurrency:>12} {elapsed:>10.2f} {baseline / elapsed:>7.1f}x")
+
+
+# Synthetic resume/JD text with the loose whitespace PDF extraction produces
+def sample_resume(paragraphs=40, seed=0):
+    rng = random.Random(seed)
+    skills = ["Python", "SQL", "Kubernetes", "React", "AWS", "Docker", "Spark", "Terraform", "Go", "Java"]
+    lines = ["Jane Doe   |   jane@example.com   |   +1 555 0100", "", "SUMMARY"]
+    for i in range(paragraphs):
+        used = ", ".join(rng.sample(skills, 3))
+        lines.append(f"  Role {i}:  Built   services with {used} for {rng.randint(1, 9)} years ,  led   a team  of {rng.randint(2, 12)}.  ")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def sample_job_description():
+    return ("We are hiring a Senior Backend Engineer. Requirements: 5+ years of Python, SQL, AWS, Docker "
+            "and Kubernetes. Nice to have: Terraform, Spark. You will design APIs, mentor engineers and "
+            "own production services. ") * 6
+
+
+def bench_prompt(args):
+    """Prompt size before and after structured prompt assembly."""
+    from ai_model import ANALYSIS_PROMPT, build_prompt, estimate_tokens
+
+    resume_text = sample_resume(args.paragraphs)
+    job_description = sample_job_description()
+    documents = [("Resume", resume_text), ("Job Description", job_description)]
+    # Old shape: documents embedded in the prompt, then appended again
+    legacy = (f"{ANALYSIS_PROMPT}\nHere is the Resume: {resume_text}\nHere is the Job Description: {job_description}"
+              f"\n\nResume: {resume_text}\n\nJob Description: {job_description}")
+    variants = [("legacy (documents sent twice)", legacy), ("build_prompt", build_prompt(ANALYSIS_PROMPT, documents, None))]
+    for budget in args.budget:
+        variants.append((f"build_prompt, budget={budget}", build_prompt(ANALYSIS_PROMPT, documents, budget)))
+
+    print(f"{'variant':<34} {'chars':>8} {'~tokens':>8} {'vs legacy':>9}")
+    for name, prompt in variants:
+        if not name.startswith("legacy"):
+            assert prompt.count("Resume:\n") == 1 and prompt.count("Job Description:\n") == 1
+        print(f"{name:<34} {len(prompt):>8} {estimate_tokens(prompt):>8} {len(prompt) / len(legacy):>8.0%}")
+
+
+def bench_client(args):
+    """Load test of GeminiClient against FakeBackend with rate limits and injected failures."""
+    from ai_model import FakeBackend, GeminiClient, RateLimiter
+
+    backend = FakeBackend(latency=args.latency, failure_rate=args.failure_rate, seed=0)
+    client = GeminiClient(backend, RateLimiter(args.rpm, args.tpm), base_delay=0.05, max_delay=1.0)
+    prompts = [f"prompt {i} " + "x" * 4000 for i in range(args.calls)]
+
+    start = time.perf_counter()
+    results = run_batch(prompts, client.generate, max_concurrency=args.concurrency)
+    elapsed = time.perf_counter() - start
+    metrics = client.metrics()
+    print(f"{args.calls} calls in {elapsed:.2f}s ({args.calls / elapsed:.1f}/s), "
+          f"limits {args.rpm} req/min, {args.tpm} tokens/min")
+    print(f"backend calls: {backend.calls}, failed after retries: {sum(not r.ok for r in results)}")
+    for name, value in metrics.items():
+        print(f"  {name:<22} {value:.3f}" if isinstance(value, float) else f"  {name:<22} {value}")
+
+
+def bench_batched(args):
+    """Tokens and wall-clock time: one call per resume vs batched prompting."""
+    import re
+    from ai_model import (ANALYSIS_PROMPT, FakeBackend, GeminiClient, estimate_tokens,
+                          get_batched_analyses, get_gemini_response, plan_batches, set_client)
+
+    rng = random.Random(0)
+    usage = {'calls': 0, 'input_tokens': 0, 'output_tokens': 0}
+
+    def analysis(candidate_id=None):
+        entry = {'overall_score': rng.randint(0, 100), 'strengths': ['a'], 'weaknesses': ['b'], 'suggestions': ['c'],
+                 'found_skills': ['Python'], 'missing_skills': ['Go'], 'summary_highlights': 'x' * 1200}
+        if candidate_id:
+            entry = {'candidate_id': candidate_id, **entry}
+        return entry
+
+    # Latency model: fixed overhead + input processing + output generation
+    def responder(prompt):
+        ids = re.findall(r"^Candidate (c\d+):$", prompt, re.MULTILINE)
+        if ids:
+            entries = [analysis(i) for i in ids if rng.random() >= args.drop_rate]
+            reply = json.dumps(entries)
+        else:
+            reply = json.dumps(analysis())
+        input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(reply)
+        usage['calls'] += 1
+        usage['input_tokens'] += input_tokens
+        usage['output_tokens'] += output_tokens
+        time.sleep(args.time_scale * (0.5 + input_tokens / 50_000 + output_tokens / 200))
+        return reply
+
+    set_client(GeminiClient(FakeBackend(responder)))
+    resumes = [sample_resume(args.paragraphs, seed=i) for i in range(args.files)]
+    job_description = sample_job_description()
+
+    def single(resume_text):
+        return json.loads(get_gemini_response(ANALYSIS_PROMPT, resume_text, job_description))
+
+    def batched(group):
+        analyses = get_batched_analyses([resumes[i] for i in group], job_description)
+        return [a if a is not None else single(resumes[i]) for i, a in zip(group, analyses)]
+
+    groups = plan_batches(resumes, job_description)
+    modes = [("one call per resume", lambda: run_batch(resumes, single, max_concurrency=args.concurrency)),
+             (f"batched ({len(groups)} groups)", lambda: run_batch(groups, batched, max_concurrency=args.concurrency))]
+    print(f"{args.files} resumes, concurrency {args.concurrency}, {args.drop_rate:.0%} of batched entries dropped")
+    print(f"{'mode':<24} {'calls':>6} {'input tok':>10} {'output tok':>10} {'wall (s)':>9}")
+    for name, run in modes:
+        usage.update(calls=0, input_tokens=0, output_tokens=0)
+        start = time.perf_counter()
+        results = run()
+        elapsed = time.perf_counter() - start
+        assert all(r.ok for r in results)
+        print(f"{name:<24} {usage['calls']:>6} {usage['input_tokens']:>10} {usage['output_tokens']:>10} {elapsed:>9.2f}")
+
+
+def bench_parse(args):
+    """Recovery rate of the JSON parser on damaged replies, and time to first streamed field."""
+    import re
+    from ai_model import FakeBackend, GeminiClient, get_analysis, set_client
+    from parsing import extract_json, validate_analysis
+
+    rng = random.Random(0)
+
+    def analysis():
+        return {'overall_score': rng.randint(0, 100), 'summary_highlights': 'Solid match. ' * 20,
+                'strengths': ['Python', 'SQL'], 'weaknesses': ['No Go'], 'suggestions': ['Add metrics'],
+                'found_skills': ['Python'], 'missing_skills': ['Go', 'Kubernetes']}
+
+    # Damage seen in real replies: code fences, prose with braces, trailing commas, truncation
+    def damaged(kind):
+        text = json.dumps(analysis(), indent=2)
+        if kind == 'fenced':
+            return f"```json\n{text}\n```"
+        if kind == 'prose braces':
+            return f"Here is the analysis {{as requested}}:\n{text}\nLet me know if you need {{more}}."
+        if kind == 'trailing comma':
+            return text[:-2] + ",\n}"
+        if kind == 'truncated':
+            return text[:rng.randint(len(text) // 2, len(text) - 2)]
+        return text
+
+    def legacy(text):
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        try:
+            return json.loads(match.group(0) if match else text)
+        except json.JSONDecodeError:
+            return None
+
+    print(f"{args.replies} replies per damage type")
+    print(f"{'damage':<16} {'legacy ok':>10} {'complete':>9} {'partial':>8} {'failed':>7}")
+    for kind in ['clean', 'fenced', 'prose braces', 'trailing comma', 'truncated']:
+        counts = {'legacy': 0, 'complete': 0, 'partial': 0, 'failed': 0}
+        for _ in range(args.replies):
+            text = damaged(kind)
+            counts['legacy'] += legacy(text) is not None
+            parsed, missing = validate_analysis(extract_json(text))
+            outcome = 'failed' if 'overall_score' in missing else 'partial' if missing else 'complete'
+            counts[outcome] += 1
+        print(f"{kind:<16} {counts['legacy']:>10} {counts['complete']:>9} {counts['partial']:>8} {counts['failed']:>7}")
+
+    # Streaming: when do the score and highlights reach the UI compared with the full reply?
+    reply = json.dumps(analysis())
+    backend = FakeBackend(lambda prompt: reply if 'previous analysis' not in prompt else '{}',
+                          latency=args.latency, chunk_size=args.chunk_size, chunk_delay=args.chunk_delay)
+    set_client(GeminiClient(backend))
+    arrivals = {}
+    start = time.perf_counter()
+    get_analysis(sample_resume(5), sample_job_description(),
+                 on_field=lambda field, value: arrivals.setdefault(field, time.perf_counter() - start))
+    total = time.perf_counter() - start
+    print(f"streamed reply of {len(reply)} chars in {args.chunk_size}-char chunks:")
+    for field in ['overall_score', 'summary_highlights']:
+        print(f"  {field:<20} shown after {arrivals[field]:.2f}s")
+    print(f"  {'full analysis':<20} ready after {total:.2f}s")
+
+    # Targeted re-ask: a reply missing two fields costs a small follow-up, not a full re-run
+    partial_reply = {k: v for k, v in analysis().items() if k not in ('suggestions', 'missing_skills')}
+    followup = json.dumps({'suggestions': ['Add metrics'], 'missing_skills': ['Go']})
+    backend = FakeBackend(lambda prompt: followup if 'previous analysis' in prompt else json.dumps(partial_reply))
+    set_client(GeminiClient(backend))
+    result = get_analysis(sample_resume(5), sample_job_description())
+    assert 'missing_fields' not in result and backend.calls == 2
+    print(f"re-ask for 2 missing fields: {len(followup)} output chars vs {len(reply)} for a full re-run")
+
+
+def bench_stages(args):
+    """Per-stage latency, token and cost breakdown of the full pipeline with a stubbed LLM."""
+    import os
+    import tempfile
+    from ai_model import FakeBackend, GeminiClient, estimate_tokens, set_client
+    from instrumentation import metrics
+    from local_db import LocalSupabase
+    from persistence import WriteBehindWriter
+    from jd_profiles import PROFILE_PROMPT, JobProfileStore
+    from pipeline import Screener, find_resumes
+    from utils import prefetch_pdf_texts
+
+    # Fixture corpus: a directory of real PDFs, or generated ones with a fixed seed
+    if args.corpus:
+        paths = find_resumes(args.corpus)
+    else:
+        directory = tempfile.mkdtemp(prefix="resume-corpus-")
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(directory, f"resume_{i:04d}.pdf")
+            with open(path, 'wb') as f:
+                f.write(make_pdf(1 + i % args.pages, seed=i))
+            paths.append(path)
+    job_description = open(args.jd, encoding='utf-8').read() if args.jd else sample_job_description()
+
+    rng = random.Random(0)
+
+    # Same latency model as the batched benchmark: fixed overhead + input + output tokens
+    def responder(prompt):
+        if prompt.startswith(PROFILE_PROMPT.strip()):
+            reply = json.dumps({'skills': ["Python", "SQL", "Cloud", "API design"],
+                                'requirements_summary': 'Python and SQL required; cloud and API design experience.'})
+        else:
+            reply = json.dumps({'overall_score': rng.randint(0, 100), 'summary_highlights': 'Stub highlights. ' * 12,
+                                'strengths': ['a'], 'weaknesses': ['b'], 'suggestions': ['c'],
+                                'found_skills': ['Python'], 'missing_skills': ['Go']})
+        time.sleep(args.time_scale * (0.5 + estimate_tokens(prompt) / 50_000 + estimate_tokens(reply) / 200))
+        return reply
+
+    set_client(GeminiClient(FakeBackend(responder, failure_rate=args.failure_rate, seed=0), base_delay=0.01))
+    db = LocalSupabase(latency=args.db_latency)
+    writer = WriteBehindWriter(db, batch_size=50, flush_interval=0.05)
+    mark = metrics.mark()
+    start = time.perf_counter()
+    profile = JobProfileStore().get(job_description)
+    screener = Screener(profile.prompt_text(job_description), profile.skills)
+    prefetch_pdf_texts(paths)
+
+    def worker(path):
+        record = screener.analyze(path)
+        writer.enqueue({'username': 'bench', 'filename': record['filename'], 'job_description': job_description,
+                        'analysis_result': json.dumps(record.get('analysis'))})
+        return record
+
+    results = run_batch(paths, worker, max_concurrency=args.concurrency)
+    writer.flush()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    failed = sum(not r.ok or r.value['status'] != 'ok' for r in results)
+    print(f"{len(paths)} resumes, concurrency {args.concurrency}, {args.failure_rate:.0%} injected LLM failures, "
+          f"{elapsed:.2f}s wall, {failed} failed")
+    print(metrics.report(since=mark))
+
+
+def bench_profiles(args):
+    """JD processing calls and prompt tokens over several batches: per-click extraction vs stored JD profiles."""
+    import os
+    import tempfile
+    from ai_model import FakeBackend, GeminiClient, get_analysis, set_client
+    from instrumentation import metrics
+    from jd_profiles import PROFILE_PROMPT, JobProfileStore, profile_cache
+
+    summary = "Senior Backend Engineer: 5+ years Python, SQL, AWS, Docker, Kubernetes; Terraform and Spark a plus. Designs APIs, mentors, owns production services."
+
+    def responder(prompt):
+        if prompt.startswith(PROFILE_PROMPT.strip()):
+            return json.dumps({'skills': ['Python', 'SQL', 'AWS', 'Docker', 'Kubernetes'], 'requirements_summary': summary})
+        return json.dumps({'overall_score': 70, 'summary_highlights': 'ok', 'strengths': [], 'weaknesses': [],
+                           'suggestions': [], 'found_skills': [], 'missing_skills': []})
+
+    set_client(GeminiClient(FakeBackend(responder)))
+    # A realistic posting: requirements wrapped in company boilerplate
+    job_description = sample_job_description() + ("About us: we are a fast-growing, award-winning company with a "
+                                                  "great culture, flexible hours and generous benefits. ") * 10
+    resumes = [sample_resume(args.paragraphs, seed=i) for i in range(args.files)]
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="jd-profiles-"), "cache.sqlite3")
+
+    def per_click(batch):
+        # No stored profiles: the posting is processed again on every click and sent in full
+        profile = JobProfileStore().get(job_description)
+        return profile.skills, job_description
+
+    def with_profiles(batch):
+        # A new store per batch, as after an app restart: profiles come back from the SQLite tier
+        profile = JobProfileStore(profile_cache(cache_path)).get(job_description)
+        return profile.skills, profile.prompt_text(job_description)
+
+    print(f"{args.batches} batches of {args.files} resumes against the same {len(job_description)}-char posting")
+    print(f"{'mode':<22} {'JD calls':>9} {'resume input tok':>17} {'total cost ($)':>15}")
+    for name, prepare in [("re-extract per click", per_click), ("stored JD profiles", with_profiles)]:
+        mark = metrics.mark()
+        for batch in range(args.batches):
+            skills, prompt_job_description = prepare(batch)
+            assert skills
+            run_batch(resumes, lambda text: get_analysis(text, prompt_job_description), max_concurrency=4)
+        counters = metrics.counters(mark)
+        jd_calls = counters.get(('llm_calls', 'jd_profile'), 0)
+        print(f"{name:<22} {jd_calls:>9.0f} {counters.get(('llm_input_tokens', 'gemini'), 0):>17.0f} "
+              f"{metrics.counter_total('llm_cost_usd', mark):>15.4f}")
+
+
+# Minimal multi-page PDF writer (Helvetica text only) for the extraction corpus
+def make_pdf(pages, lines_per_page=40, seed=0):
+    rng = random.Random(seed)
+    words = ["python", "data", "pipeline", "team", "lead", "cloud", "design", "api", "sql", "deliver"]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(words) for _ in range(12)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 12 TL 40 780 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def bench_pdf(args):
+    """Pages/sec and peak memory of PDF extraction, serial vs process pool."""
+    import resource
+    import tracemalloc
+    import pdf_extraction
+
+    corpus = [make_pdf(args.pages, seed=i) for i in range(args.files)]
+    total_pages = args.files * args.pages
+    print(f"{args.files} PDFs x {args.pages} pages ({sum(map(len, corpus)) / 1e6:.1f} MB)")
+    print(f"{'mode':<22} {'wall (s)':>9} {'pages/s':>9} {'peak py MB':>11} {'child RSS MB':>13}")
+    for name, workers in [("serial", 1)] + [(f"process pool x{w}", w) for w in args.workers]:
+        pdf_extraction.text_cache.clear()
+        start = time.perf_counter()
+        texts = pdf_extraction.extract_texts(corpus, max_pages=None, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        # Second, untimed pass for memory: tracemalloc slows the parent process down
+        pdf_extraction.text_cache.clear()
+        tracemalloc.start()
+        pdf_extraction.extract_texts(corpus, max_pages=None, max_workers=workers)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        assert all(isinstance(t, str) and t for t in texts)
+        print(f"{name:<22} {elapsed:>9.2f} {total_pages / elapsed:>9.0f} {peak / 1e6:>11.1f} {child_rss:>13.1f}")
+    start = time.perf_counter()
+    pdf_extraction.extract_texts(corpus, max_pages=None)
+    print(f"{'cached (repeat)':<22} {time.perf_counter() - start:>9.4f}")
+
+
+def bench_prescreen(args):
+    """Per-resume cost of the local skill-coverage pre-screen."""
+    from prescreen import SkillMatcher, select_candidates
+
+    skills = ["Python", "SQL", "AWS", "Docker", "Kubernetes", "Terraform", "Spark", "Go", "Machine Learning", "CI/CD"]
+    resumes = [sample_resume(args.paragraphs, seed=i) for i in range(args.files)]
+    start = time.perf_counter()
+    matcher = SkillMatcher(skills)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    coverages = [matcher.score(text)['coverage'] for text in resumes]
+    elapsed = time.perf_counter() - start
+    selected = select_candidates(coverages, top_k=args.top_k)
+    print(f"index build: {build * 1e3:.2f} ms for {len(skills)} skills")
+    print(f"{args.files} resumes scored in {elapsed * 1e3:.1f} ms ({elapsed / args.files * 1e6:.0f} us/resume)")
+    print(f"top {args.top_k} sent to the LLM: {len(selected)} of {args.files}")
+
+
+def bench_embeddings(args):
+    """Index build and top-K query time for ranking a JD against a talent pool."""
+    import os
+    import tempfile
+    from embeddings import EmbeddingIndex, HashingEmbedder
+
+    resumes = [sample_resume(args.paragraphs, seed=i) for i in range(args.files)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pool")
+        index = EmbeddingIndex(HashingEmbedder(args.dim), path)
+        start = time.perf_counter()
+        for offset in range(0, len(resumes), 500):
+            chunk = resumes[offset:offset + 500]
+            index.add([str(offset + i) for i in range(len(chunk))], chunk)
+        index.save()
+        build = time.perf_counter() - start
+
+        index = EmbeddingIndex(HashingEmbedder(args.dim), path)
+        queries = [sample_job_description()] * args.queries
+        start = time.perf_counter()
+        index.search(queries, k=args.k)
+        query = (time.perf_counter() - start) / args.queries
+    print(f"{args.files} resumes, dim {args.dim}: built and saved in {build:.2f}s")
+    print(f"top-{args.k} query against the memory-mapped index: {query * 1e3:.2f} ms/JD")
+
+
+def seed_history(db, rows, username="bench", seed=0):
+    """Fills a LocalSupabase with `rows` analysis_history rows for `username`."""
+    rng = random.Random(seed)
+    job_description = sample_job_description()
+    batch = []
+    for i in range(rows):
+        analysis = {'overall_score': rng.randint(0, 100), 'strengths': ['s' * 80] * 4, 'weaknesses': ['w' * 80] * 4,
+                    'suggestions': ['g' * 80] * 4, 'found_skills': ['Python', 'SQL'], 'missing_skills': ['Go'],
+                    'summary_highlights': 'h' * 300}
+        batch.append({'username': username, 'filename': f"resume_{i}.pdf", 'job_description': job_description,
+                      'resume_text': sample_resume(60, seed=i % 50), 'analysis_result': json.dumps(analysis)})
+        if len(batch) == 1000:
+            db.table('analysis_history').insert(batch).execute()
+            batch = []
+    if batch:
+        db.table('analysis_history').insert(batch).execute()
+
+
+def bench_history(args):
+    """Login-time history load: select('*') of every row vs paginated summaries."""
+    import pickle
+    import tracemalloc
+    from history import fetch_history_page
+    from local_db import LocalSupabase
+
+    db = LocalSupabase()
+    seed_history(db, args.rows)
+
+    def legacy():
+        history = db.table('analysis_history').select('*').eq('username', 'bench').execute().data
+        for entry in history:  # the sidebar parsed every entry on each rerun
+            json.loads(entry['analysis_result'])
+        return history
+
+    def paginated():
+        history, before_id = fetch_history_page(db, 'bench', page_size=args.page_size)
+        return history
+
+    print(f"{args.rows} rows in the local stand-in database")
+    print(f"{'login load':<26} {'time (ms)':>10} {'entries':>8} {'session KB':>11} {'peak MB':>8}")
+    for name, load in [("select('*') + json.loads", legacy), (f"summary page ({args.page_size})", paginated)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        history = load()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        size = len(pickle.dumps(history)) / 1024
+        print(f"{name:<26} {elapsed * 1e3:>10.1f} {len(history):>8} {size:>11.0f} {peak / 1e6:>8.1f}")
+
+    start = time.perf_counter()
+    before_id, pages = None, 0
+    while True:
+        _, before_id = fetch_history_page(db, 'bench', before_id, page_size=args.page_size)
+        pages += 1
+        if before_id is None:
+            break
+    print(f"walking all {pages} summary pages by keyset: {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+
+def bench_persist(args):
+    """Throughput of per-row inserts vs the write-behind bulk writer."""
+    from local_db import LocalSupabase
+    from persistence import WriteBehindWriter
+
+    job_description = sample_job_description()
+    rows = [{'username': 'bench', 'filename': f"resume_{i}.pdf", 'job_description': job_description,
+             'resume_text': sample_resume(40, seed=i % 50), 'analysis_result': json.dumps({'overall_score': i % 100})}
+            for i in range(args.rows)]
+
+    def stored_jd_bytes(db):
+        total = 0
+        for table in ('analysis_history', 'job_descriptions'):
+            total += sum(len(r.get('job_description') or '') for r in db.table(table).select('*').execute().data)
+        return total
+
+    print(f"{args.rows} rows, {args.latency * 1000:.0f} ms simulated round trip per request")
+    print(f"{'mode':<30} {'wall (s)':>9} {'rows/s':>8} {'requests':>9} {'JD KB stored':>13}")
+
+    db = LocalSupabase(latency=args.latency)
+    start = time.perf_counter()
+    for row in rows:
+        db.table('analysis_history').insert(row).execute()
+    elapsed = time.perf_counter() - start
+    db.latency = 0
+    print(f"{'one insert per row':<30} {elapsed:>9.2f} {args.rows / elapsed:>8.0f} {args.rows:>9} {stored_jd_bytes(db) / 1024:>13.0f}")
+
+    db = LocalSupabase(latency=args.latency)
+    writer = WriteBehindWriter(db, batch_size=args.batch_size, flush_interval=0.05, dedupe_job_descriptions=True)
+    start = time.perf_counter()
+    for row in rows:
+        writer.enqueue(row)
+    enqueue_time = time.perf_counter() - start
+    writer.flush()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    db.latency = 0
+    requests = writer.stats['batches'] + writer.stats['jd_written']
+    print(f"{f'write-behind (batch {args.batch_size})':<30} {elapsed:>9.2f} {args.rows / elapsed:>8.0f} {requests:>9} {stored_jd_bytes(db) / 1024:>13.0f}")
+    print(f"time the caller spent enqueuing: {enqueue_time * 1e3:.1f} ms")
+
+
+BENCHMARKS = {
+    'batch': bench_batch,
+    'prompt': bench_prompt,
+    'client': bench_client,
+    'batched': bench_batched,
+    'pdf': bench_pdf,
+    'prescreen': bench_prescreen,
+    'embeddings': bench_embeddings,
+    'history': bench_history,
+    'persist': bench_persist,
+    'parse': bench_parse,
+    'stages': bench_stages,
+    'profiles': bench_profiles,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the resume analyzer.")
+    sub = parser.add_subparsers(dest='name', required=True)
+
+    p = sub.add_parser('batch', help=bench_batch.__doc__)
+    p.add_argument('--files', type=int, default=32)
+    p.add_argument('--latency', type=float, default=0.25, help="Seconds per stubbed LLM call.")
+    p.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+
+    p = sub.add_parser('prompt', help=bench_prompt.__doc__)
+    p.add_argument('--paragraphs', type=int, default=200, help="Length of the sample resume.")
+    p.add_argument('--budget', type=int, nargs='*', default=[2000, 1000])
+
+    p = sub.add_parser('client', help=bench_client.__doc__)
+    p.add_argument('--calls', type=int, default=200)
+    p.add_argument('--concurrency', type=int, default=16)
+    p.add_argument('--latency', type=float, default=0.02)
+    p.add_argument('--failure-rate', type=float, default=0.1)
+    p.add_argument('--rpm', type=int, default=1200)
+    p.add_argument('--tpm', type=int, default=2_000_000)
+
+    p = sub.add_parser('batched', help=bench_batched.__doc__)
+    p.add_argument('--files', type=int, default=40)
+    p.add_argument('--paragraphs', type=int, default=25, help="Length of each sample resume.")
+    p.add_argument('--concurrency', type=int, default=4)
+    p.add_argument('--drop-rate', type=float, default=0.05, help="Chance a batched entry is missing.")
+    p.add_argument('--time-scale', type=float, default=0.02, help="Seconds per unit of the latency model.")
+
+    p = sub.add_parser('pdf', help=bench_pdf.__doc__)
+    p.add_argument('--files', type=int, default=16)
+    p.add_argument('--pages', type=int, default=20)
+    p.add_argument('--workers', type=int, nargs='*', default=[2, 4])
+
+    p = sub.add_parser('prescreen', help=bench_prescreen.__doc__)
+    p.add_argument('--files', type=int, default=500)
+    p.add_argument('--paragraphs', type=int, default=25)
+    p.add_argument('--top-k', type=int, default=50)
+
+    p = sub.add_parser('embeddings', help=bench_embeddings.__doc__)
+    p.add_argument('--files', type=int, default=5000)
+    p.add_argument('--paragraphs', type=int, default=15)
+    p.add_argument('--dim', type=int, default=1024)
+    p.add_argument('--queries', type=int, default=20)
+    p.add_argument('--k', type=int, default=20)
+
+    p = sub.add_parser('history', help=bench_history.__doc__)
+    p.add_argument('--rows', type=int, default=10_000)
+    p.add_argument('--page-size', type=int, default=50)
+
+    p = sub.add_parser('persist', help=bench_persist.__doc__)
+    p.add_argument('--rows', type=int, default=1000)
+    p.add_argument('--batch-size', type=int, default=50)
+    p.add_argument('--latency', type=float, default=0.01, help="Seconds per simulated database request.")
+
+    p = sub.add_parser('parse', help=bench_parse.__doc__)
+    p.add_argument('--replies', type=int, default=200, help="Damaged replies per damage type.")
+    p.add_argument('--latency', type=float, default=0.3, help="Seconds before the first streamed chunk.")
+    p.add_argument('--chunk-size', type=int, default=32)
+    p.add_argument('--chunk-delay', type=float, default=0.05, help="Seconds between streamed chunks.")
+
+    p = sub.add_parser('stages', help=bench_stages.__doc__)
+    p.add_argument('--corpus', help="Directory of PDFs to replay (default: a generated corpus).")
+    p.add_argument('--jd', help="Job description text file (default: the sample JD).")
+    p.add_argument('--files', type=int, default=40, help="Size of the generated corpus.")
+    p.add_argument('--pages', type=int, default=4, help="Maximum pages per generated resume.")
+    p.add_argument('--concurrency', type=int, default=8)
+    p.add_argument('--failure-rate', type=float, default=0.05)
+    p.add_argument('--time-scale', type=float, default=0.02, help="Seconds per unit of the LLM latency model.")
+    p.add_argument('--db-latency', type=float, default=0.01, help="Seconds per simulated database request.")
+
+    p = sub.add_parser('profiles', help=bench_profiles.__doc__)
+    p.add_argument('--batches', type=int, default=5)
+    p.add_argument('--files', type=int, default=20)
+    p.add_argument('--paragraphs', type=int, default=15, help="Length of each sample resume.")
+
+    args = parser.parse_args()
+    BENCHMARKS[args.name](args)
+
+
+if __name__ == '__main__':
+    main()
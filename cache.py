@@ -0,0 +1,226 @@
+# cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import metrics
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "analysis_cache.sqlite3")
+DEFAULT_MEMORY_ENTRIES = 512
+DEFAULT_DISK_ENTRIES = 20000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+
+# Function to build a stable content hash from bytes/str parts
+def content_hash(*parts):
+    """Returns a hex SHA-256 digest over the given parts, in order."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def analysis_cache_key(resume_bytes, job_description, prompt_template):
+    """Cache key for one resume scored against one JD with one prompt version."""
+    return content_hash("analysis", content_hash(resume_bytes), content_hash(job_description), content_hash(prompt_template))
+
+
+class MemoryTier:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=DEFAULT_MEMORY_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if self.ttl and time.time() - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, created_at=None):
+        self._entries[key] = (value, created_at or time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """On-disk tier that survives restarts, evicted by TTL and least-recent access."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_DISK_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Generous lock timeout: CLI worker processes may share the file
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self.ttl and time.time() - created_at > self.ttl:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return json.loads(value), created_at
+
+    def set(self, key, value):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now),
+        )
+        self.evict()
+        self._conn.commit()
+
+    def evict(self):
+        if self.ttl:
+            self._conn.execute("DELETE FROM cache WHERE created_at < ?", (time.time() - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        self._conn.execute("DELETE FROM cache")
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class SupabaseTier:
+    """Read-through lookup of earlier results stored in the `analysis_history` table.
+
+    Rows are matched on the optional `cache_key` column (see history.CACHE_KEY_COLUMN
+    for its migration), which the app writes alongside each analysis once the column
+    exists. Writes happen with the normal history insert.
+    """
+
+    def __init__(self, client, table="analysis_history"):
+        self.client = client
+        self.table = table
+
+    def get(self, key):
+        response = self.client.table(self.table).select("analysis_result").eq("cache_key", key).limit(1).execute()
+        if not response.data:
+            return None
+        result = response.data[0]["analysis_result"]
+        return json.loads(result) if isinstance(result, str) else result
+
+    def set(self, key, value):
+        pass
+
+
+class AnalysisCache:
+    """Two-level (memory + SQLite) cache with an optional remote Supabase tier.
+
+    Lookups are also counted in the shared metrics registry under `name`.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 disk_entries=DEFAULT_DISK_ENTRIES, ttl=DEFAULT_TTL_SECONDS, remote=None, name="analysis"):
+        self.name = name
+        self.memory = MemoryTier(memory_entries, ttl)
+        self.disk = SQLiteTier(path, disk_entries, ttl) if path else None
+        self.remote = remote
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "remote_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def hits(self):
+        return self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["remote_hits"]
+
+    @property
+    def misses(self):
+        return self.stats["misses"]
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self._count("memory_hits")
+                return value
+            if self.disk is not None:
+                row = self.disk.get(key)
+                if row is not None:
+                    value, created_at = row
+                    self.memory.set(key, value, created_at)
+                    self._count("disk_hits")
+                    return value
+        if self.remote is not None:
+            try:
+                value = self.remote.get(key)
+            except Exception:
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._store_local(key, value)
+                    self._count("remote_hits")
+                return value
+        with self._lock:
+            self._count("misses")
+        return None
+
+    def _count(self, outcome):
+        self.stats[outcome] += 1
+        metrics.incr("cache_lookups", label=f"{self.name}:{outcome}")
+
+    def set(self, key, value):
+        with self._lock:
+            self._store_local(key, value)
+
+    def _store_local(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value, or calls `compute()` and caches a non-empty result."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value:
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            if self.disk is not None:
+                self.disk.clear()
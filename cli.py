@@ -0,0 +1,176 @@
+# cli.py
+"""Headless batch screening: one job description against a directory of PDF resumes.
+
+Results are streamed as JSON lines (one record per resume). When writing to a file,
+the file doubles as a checkpoint: rerunning the same command skips resumes that
+already have a final record for the same job description and retries the ones
+that failed.
+
+    GOOGLE_API_KEY=... python cli.py --jd job.txt --resumes ./resumes -o results.jsonl --workers 4 --max-concurrency 8
+
+Settings (GOOGLE_API_KEY, GEMINI_MODEL, GEMINI_REQUESTS_PER_MINUTE, ...) are read
+from environment variables.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from ai_model import GeminiError
+from batch import DEFAULT_MAX_CONCURRENCY, MAX_CONCURRENCY_LIMIT
+from cache import DEFAULT_CACHE_PATH, content_hash
+from instrumentation import metrics
+from pdf_extraction import read_bytes
+from pipeline import FINAL_STATUSES, configure_client, find_resumes, run_pipeline
+from jd_profiles import JobProfileStore, profile_cache
+
+logger = logging.getLogger("cli")
+
+
+# Function to read the resumes already finished in a previous run
+def load_checkpoint(path, jd_hash):
+    """Returns the resume hashes of records with a final status for `jd_hash` in the
+    JSONL file at `path`.
+
+    Records are matched on the resume bytes and the raw job description, not on the
+    analysis cache key: that is built from the prompt JD, which may be an LLM-written
+    summary that differs between runs. A torn last line (from a killed run) is
+    ignored and its resume is redone.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") in FINAL_STATUSES and record.get("jd_hash") == jd_hash and record.get("resume_hash"):
+                done.add(record["resume_hash"])
+    return done
+
+
+def open_output(path):
+    if path == "-":
+        return sys.stdout
+    # Make sure appended records start on a fresh line after a torn write
+    needs_newline = False
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    output = open(path, "a", encoding="utf-8")
+    if needs_newline:
+        output.write("\n")
+    return output
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a directory of PDF resumes against a job description.")
+    parser.add_argument("--jd", required=True, help="Text file holding the job description.")
+    parser.add_argument("--resumes", required=True, help="Directory searched recursively for .pdf files.")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSONL output file, also used as the resume checkpoint (default: stdout).")
+    parser.add_argument("--restart", action="store_true", help="Ignore records already in the output file.")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help=f"Resumes analyzed at once per worker process (max {MAX_CONCURRENCY_LIMIT}).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; the Gemini rate limits are shared between them.")
+    parser.add_argument("--min-coverage", type=int, default=0,
+                        help="Skip the LLM for resumes matching less than this %% of the JD's skills.")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="Analysis cache database shared with the app ('' to disable).")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Run the whole pipeline with a canned model reply instead of calling Gemini "
+                             "(the analysis cache is not used).")
+    parser.add_argument("--full-jd", action="store_true",
+                        help="Send the full job description with each resume instead of the condensed requirements.")
+    parser.add_argument("--metrics", help="Write Prometheus text-format metrics to this file at the end.")
+    parser.add_argument("--log-spans", action="store_true",
+                        help="Log every timing span and LLM call as a JSON line on stderr.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+    if args.log_spans:
+        span_logger = logging.getLogger("instrumentation")
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        span_logger.addHandler(handler)
+        span_logger.setLevel(logging.DEBUG)
+        span_logger.propagate = False
+    with open(args.jd, encoding="utf-8") as f:
+        job_description = f.read().strip()
+    if not job_description:
+        logger.error("The job description file %s is empty.", args.jd)
+        return 2
+    paths = find_resumes(args.resumes)
+    if not paths:
+        logger.info("No PDFs found under %s.", args.resumes)
+        return 0
+
+    backend = "dry-run" if args.dry_run else "gemini"
+    cache_path = None if args.dry_run else args.cache or None
+    try:
+        configure_client(backend)
+    except GeminiError as e:
+        logger.error("%s", e)
+        return 2
+    # The JD profile (skills + condensed requirements) is built once per posting and stored beside the cache
+    errors = []
+    profile = JobProfileStore(profile_cache(cache_path) if cache_path else None).get(
+        job_description, on_error=errors.append)
+    for message in errors:
+        logger.warning(message)
+    prompt_job_description = job_description if args.full_jd else profile.prompt_text(job_description)
+    jd_hash = content_hash(job_description)
+
+    if args.output != "-" and not args.restart:
+        done = load_checkpoint(args.output, jd_hash)
+        if done:
+            before = len(paths)
+            paths = [path for path in paths if content_hash(read_bytes(path)) not in done]
+            logger.info("Checkpoint: %d of %d resumes already done", before - len(paths), before)
+    if args.output != "-" and args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    if not paths:
+        logger.info("Nothing to do.")
+        return 0
+    logger.info("Screening %d resumes (%d worker(s) x %d concurrent); JD skills: %s",
+                len(paths), args.workers, args.max_concurrency, ", ".join(profile.skills) or "none")
+
+    counts = {}
+    output = open_output(args.output)
+    start = time.perf_counter()
+
+    def on_record(record):
+        record["jd_hash"] = jd_hash
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+        if record.get("error"):
+            logger.warning("%s: %s", record["filename"], record["error"])
+
+    try:
+        run_pipeline(paths, prompt_job_description, on_record, job_skills=profile.skills, min_coverage=args.min_coverage,
+                     cache_path=cache_path, max_concurrency=args.max_concurrency,
+                     workers=args.workers, backend=backend)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    logger.info("Finished in %.1fs: %s", time.perf_counter() - start,
+                ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    print(metrics.report(), file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(metrics.prometheus())
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
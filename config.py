@@ -0,0 +1,23 @@
+# config.py
+import os
+import sys
+
+
+# Function to read a setting from the environment or Streamlit's secrets
+def get_setting(name, default=None, cast=None):
+    """Returns `name` from the environment, else from st.secrets, else `default`.
+
+    Streamlit's secrets are only consulted when Streamlit is already loaded (i.e.
+    inside the app), so headless callers never import it. Environment values are
+    strings; pass `cast` (e.g. int) to convert them.
+    """
+    value = os.environ.get(name)
+    if value is None and "streamlit" in sys.modules:
+        try:
+            value = sys.modules["streamlit"].secrets.get(name)
+        except Exception:
+            # No secrets.toml: behave as if the key were unset
+            value = None
+    if value is None:
+        return default
+    return cast(value) if cast else value
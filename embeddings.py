@@ -0,0 +1,173 @@
+# embeddings.py
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+DEFAULT_DIM = 1024
+DEFAULT_GEMINI_EMBEDDING_MODEL = "models/text-embedding-004"
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+
+def normalize_rows(matrix):
+    """L2-normalizes each row; all-zero rows stay zero."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class HashingEmbedder:
+    """Deterministic local embedder: hashed unigrams and bigrams with sublinear TF.
+
+    Needs no network or model files, so it works offline and gives the same vectors
+    in every process.
+    """
+
+    def __init__(self, dim=DEFAULT_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        tokens = TOKEN_PATTERN.findall((text or "").lower())
+        return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+    def _bucket(self, feature):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts):
+        """Returns a (len(texts), dim) float32 matrix of unit vectors."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                column, sign = self._bucket(feature)
+                matrix[row, column] += sign * (1.0 + math.log(count))
+        return normalize_rows(matrix)
+
+
+class GeminiEmbedder:
+    """Embeds text with Gemini's embedding model (needs network and an API key)."""
+
+    def __init__(self, model=DEFAULT_GEMINI_EMBEDDING_MODEL, task_type="retrieval_document"):
+        self.model = model
+        self.task_type = task_type
+        self.name = f"gemini-{model}"
+
+    def embed(self, texts):
+        import google.generativeai as genai
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        response = genai.embed_content(model=self.model, content=list(texts), task_type=self.task_type)
+        return normalize_rows(np.asarray(response["embedding"], dtype=np.float32))
+
+
+class EmbeddingIndex:
+    """Matrix of normalized vectors with string ids, searchable by cosine similarity.
+
+    With a `path`, vectors are saved as `<path>.npy` (loaded memory-mapped) and the
+    ids plus metadata as `<path>.json`. Adds are incremental: new rows go into an
+    in-memory buffer that is merged on the next `save()`.
+    """
+
+    def __init__(self, embedder, path=None):
+        self.embedder = embedder
+        self.path = path
+        self.ids = []
+        self.meta = {}
+        self._positions = {}
+        self._matrix = None
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _load(self):
+        try:
+            with open(self.path + ".json") as f:
+                stored = json.load(f)
+            if stored.get("embedder") != self.embedder.name:
+                return
+            matrix = np.load(self.path + ".npy", mmap_mode="r")
+        except (OSError, ValueError):
+            return
+        if matrix.shape[0] != len(stored["ids"]):
+            return
+        self.ids = stored["ids"]
+        self.meta = stored.get("meta", {})
+        self._positions = {id_: i for i, id_ in enumerate(self.ids)}
+        self._matrix = matrix
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            matrix = self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=np.float32)
+            tmp = self.path + ".tmp.npy"
+            np.save(tmp, np.ascontiguousarray(matrix))
+            os.replace(tmp, self.path + ".npy")
+            with open(self.path + ".json.tmp", "w") as f:
+                json.dump({"embedder": self.embedder.name, "ids": self.ids, "meta": self.meta}, f)
+            os.replace(self.path + ".json.tmp", self.path + ".json")
+            self._matrix = np.load(self.path + ".npy", mmap_mode="r")
+
+    def add(self, ids, texts=None, vectors=None):
+        """Adds (or replaces) entries. Pass either raw `texts` or precomputed `vectors`."""
+        if not ids:
+            return
+        if vectors is None:
+            vectors = self.embedder.embed(texts)
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            new_rows = []
+            matrix = self._matrix
+            for id_, vector in zip(ids, vectors):
+                position = self._positions.get(id_)
+                if position is None:
+                    self._positions[id_] = len(self.ids)
+                    self.ids.append(id_)
+                    new_rows.append(vector)
+                else:
+                    if not matrix.flags.writeable:
+                        matrix = np.array(matrix)
+                    matrix[position] = vector
+            if new_rows:
+                stacked = np.vstack(new_rows)
+                matrix = stacked if matrix is None or matrix.shape[0] == 0 else np.vstack([matrix, stacked])
+            self._matrix = matrix
+
+    def search(self, queries, k=10):
+        """Top-k (id, score) lists for each query text (batched cosine similarity)."""
+        return self.search_vectors(self.embedder.embed(list(queries)), k)
+
+    def search_vectors(self, query_vectors, k=10):
+        with self._lock:
+            matrix, ids = self._matrix, list(self.ids)
+        if matrix is None or not ids:
+            return [[] for _ in range(len(query_vectors))]
+        scores = np.asarray(normalize_rows(np.asarray(query_vectors, dtype=np.float32)) @ matrix.T)
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates], kind="stable")]
+            results.append([(ids[i], float(scores[row, i])) for i in ordered])
+        return results
+
+
+# Function to pick the embedding backend by name
+def make_embedder(backend="hashing", **options):
+    """Returns an embedder for `backend` ("hashing" or "gemini")."""
+    if backend == "gemini":
+        return GeminiEmbedder(**options)
+    if backend == "hashing":
+        return HashingEmbedder(**options)
+    raise ValueError(f"Unknown embedding backend: {backend}")
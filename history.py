@@ -0,0 +1,65 @@
+# history.py
+import json
+
+from parsing import ANALYSIS_SCHEMA
+
+# Columns fetched when listing history; resume_text and job_description stay in the database
+SUMMARY_COLUMNS = ["id", "filename", "created_at", "analysis_result"]
+# Optional column holding each row's analysis cache key (used for duplicate detection and
+# the Supabase cache tier). Existing tables need this migration before it is used:
+#     alter table analysis_history add column cache_key text;
+#     create index analysis_history_cache_key on analysis_history (cache_key);
+CACHE_KEY_COLUMN = "cache_key"
+# Analysis fields kept in session state for each listed entry
+ANALYSIS_FIELDS = list(ANALYSIS_SCHEMA) + ["skill_coverage", "missing_fields", "raw_response"]
+DEFAULT_PAGE_SIZE = 50
+
+
+# Function to shrink a database row to what the app displays
+def compact_entry(row):
+    """Returns a history entry holding the parsed analysis, limited to the displayed fields.
+
+    The analysis is parsed once here and kept as a dict, so nothing is fetched or
+    parsed again when results are shown.
+    """
+    analysis = row.get("analysis_result")
+    if isinstance(analysis, str):
+        try:
+            analysis = json.loads(analysis)
+        except json.JSONDecodeError:
+            analysis = None
+    entry = {"id": row.get("id"), "filename": row.get("filename"), "created_at": row.get("created_at")}
+    if row.get("cache_key"):
+        entry["cache_key"] = row["cache_key"]
+    if isinstance(analysis, dict):
+        entry["analysis_result"] = {field: analysis[field] for field in ANALYSIS_FIELDS if field in analysis}
+    else:
+        entry["analysis_result"] = row.get("analysis_result")
+    return entry
+
+
+# Function to check whether an optional column exists
+def has_column(client, column, table="analysis_history"):
+    """True if `column` can be selected from `table`, i.e. its migration has been run."""
+    try:
+        client.table(table).select(column).limit(1).execute()
+        return True
+    except Exception:
+        return False
+
+
+# Function to load one page of a user's history, newest first
+def fetch_history_page(client, username, before_id=None, page_size=DEFAULT_PAGE_SIZE, extra_columns=()):
+    """Fetches up to `page_size` rows older than `before_id` (keyset pagination).
+
+    Returns (entries in oldest-to-newest order, id to pass as `before_id` for the next
+    page, or None when there are no older rows).
+    """
+    columns = ", ".join(SUMMARY_COLUMNS + list(extra_columns))
+    query = client.table("analysis_history").select(columns).eq("username", username)
+    if before_id is not None:
+        query = query.lt("id", before_id)
+    rows = query.order("id", desc=True).limit(page_size).execute().data or []
+    entries = [compact_entry(row) for row in reversed(rows)]
+    next_before_id = rows[-1]["id"] if len(rows) == page_size else None
+    return entries, next_before_id
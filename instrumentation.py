@@ -0,0 +1,190 @@
+# instrumentation.py
+"""Per-stage timing spans, LLM token/cost accounting and counters.
+
+One process-wide `metrics` registry is shared by the app, the CLI and the
+benchmarks. Spans and LLM calls are also logged as JSON lines on the
+"instrumentation" logger at DEBUG level, and the whole registry can be exported
+in the Prometheus text format.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from config import get_setting
+
+# Gemini 1.5 Flash list prices in USD per million tokens (prompts up to 128k tokens)
+DEFAULT_INPUT_PRICE_PER_MILLION = 0.075
+DEFAULT_OUTPUT_PRICE_PER_MILLION = 0.30
+# Spans kept for percentile summaries; older ones still count in the totals
+DEFAULT_MAX_SPANS = 20000
+# Pipeline stages in display order
+STAGES = ["pdf_extraction", "pdf_prefetch", "jd_profile", "gemini", "gemini_reask", "gemini_batch", "json_parse",
+          "db_insert"]
+PROMETHEUS_PREFIX = "resume_analyzer"
+
+logger = logging.getLogger("instrumentation")
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Metrics:
+    """Thread-safe registry of stage spans and labelled counters.
+
+    `mark()` snapshots the registry; passing the mark as `since` to the summary
+    methods limits them to what happened afterwards, e.g. the current batch.
+    """
+
+    def __init__(self, max_spans=DEFAULT_MAX_SPANS, input_price=None, output_price=None):
+        self.input_price = input_price if input_price is not None else get_setting(
+            "GEMINI_INPUT_PRICE_PER_MILLION", DEFAULT_INPUT_PRICE_PER_MILLION, cast=float)
+        self.output_price = output_price if output_price is not None else get_setting(
+            "GEMINI_OUTPUT_PRICE_PER_MILLION", DEFAULT_OUTPUT_PRICE_PER_MILLION, cast=float)
+        self._spans = deque(maxlen=max_spans)
+        self._stage_totals = defaultdict(lambda: [0, 0.0])
+        self._counters = defaultdict(float)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """Times the enclosed block as one `stage` span (also when it raises)."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, error=error, **fields)
+
+    def observe(self, stage, seconds, **fields):
+        with self._lock:
+            self._add_span(stage, seconds)
+        if logger.isEnabledFor(logging.DEBUG):
+            event = {"event": "span", "stage": stage, "seconds": round(seconds, 6)}
+            event.update({k: v for k, v in fields.items() if v is not None})
+            logger.debug(json.dumps(event))
+
+    def _add_span(self, stage, seconds):
+        self._seq += 1
+        self._spans.append((self._seq, stage, seconds))
+        totals = self._stage_totals[stage]
+        totals[0] += 1
+        totals[1] += seconds
+
+    def incr(self, name, value=1, label=""):
+        with self._lock:
+            self._counters[(name, label)] += value
+
+    def record_llm_call(self, stage, input_tokens, output_tokens):
+        """Counts one LLM call's tokens and estimated cost under `stage`."""
+        cost = (input_tokens * self.input_price + output_tokens * self.output_price) / 1_000_000
+        with self._lock:
+            self._counters[("llm_calls", stage)] += 1
+            self._counters[("llm_input_tokens", stage)] += input_tokens
+            self._counters[("llm_output_tokens", stage)] += output_tokens
+            self._counters[("llm_cost_usd", stage)] += cost
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({"event": "llm_call", "stage": stage, "input_tokens": input_tokens,
+                                     "output_tokens": output_tokens, "cost_usd": round(cost, 8)}))
+        return cost
+
+    def mark(self):
+        with self._lock:
+            return self._seq, dict(self._counters)
+
+    def snapshot(self, since=None):
+        """Spans and counter deltas after `since`, e.g. to send from a worker process to `merge`."""
+        after = since[0] if since else 0
+        with self._lock:
+            spans = [(stage, seconds) for seq, stage, seconds in self._spans if seq > after]
+        return {"spans": spans, "counters": self.counters(since)}
+
+    def merge(self, snapshot):
+        with self._lock:
+            for stage, seconds in snapshot["spans"]:
+                self._add_span(stage, seconds)
+            for key, value in snapshot["counters"].items():
+                self._counters[key] += value
+
+    def stage_summary(self, since=None):
+        """{stage: {'count', 'total', 'p50', 'p95'}} in seconds, for spans after `since`."""
+        after = since[0] if since else 0
+        by_stage = defaultdict(list)
+        with self._lock:
+            for seq, stage, seconds in self._spans:
+                if seq > after:
+                    by_stage[stage].append(seconds)
+        summary = {}
+        for stage in sorted(by_stage, key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s)):
+            values = sorted(by_stage[stage])
+            summary[stage] = {"count": len(values), "total": sum(values),
+                              "p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+        return summary
+
+    def counters(self, since=None):
+        """{(name, label): value} accumulated after `since` (all time by default)."""
+        base = since[1] if since else {}
+        with self._lock:
+            current = dict(self._counters)
+        return {key: value - base.get(key, 0) for key, value in current.items() if value - base.get(key, 0)}
+
+    def counter_total(self, name, since=None):
+        return sum(value for (counter, _), value in self.counters(since).items() if counter == name)
+
+    def report(self, since=None):
+        """Plain-text breakdown of stages, LLM usage and counters."""
+        lines = [f"{'stage':<16} {'count':>6} {'total (s)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9}"]
+        for stage, s in self.stage_summary(since).items():
+            lines.append(f"{stage:<16} {s['count']:>6} {s['total']:>10.3f} {s['p50'] * 1e3:>9.1f} {s['p95'] * 1e3:>9.1f}")
+        counters = self.counters(since)
+        llm_stages = sorted({label for name, label in counters if name == "llm_calls"})
+        if llm_stages:
+            lines.append(f"{'llm stage':<16} {'calls':>6} {'input tok':>10} {'output tok':>10} {'cost ($)':>9}")
+            for stage in llm_stages:
+                lines.append(
+                    f"{stage:<16} {counters.get(('llm_calls', stage), 0):>6.0f} "
+                    f"{counters.get(('llm_input_tokens', stage), 0):>10.0f} "
+                    f"{counters.get(('llm_output_tokens', stage), 0):>10.0f} "
+                    f"{counters.get(('llm_cost_usd', stage), 0):>9.4f}"
+                )
+        others = sorted((key, value) for key, value in counters.items() if not key[0].startswith("llm_"))
+        if others:
+            lines.append("counters: " + ", ".join(f"{name}{f'[{label}]' if label else ''}={value:g}"
+                                                  for (name, label), value in others))
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """All-time metrics in the Prometheus text exposition format."""
+        p = PROMETHEUS_PREFIX
+        lines = [f"# TYPE {p}_stage_seconds summary"]
+        for stage, s in self.stage_summary().items():
+            lines.append(f'{p}_stage_seconds{{stage="{stage}",quantile="0.5"}} {s["p50"]:.6f}')
+            lines.append(f'{p}_stage_seconds{{stage="{stage}",quantile="0.95"}} {s["p95"]:.6f}')
+        with self._lock:
+            totals = {stage: list(values) for stage, values in self._stage_totals.items()}
+        for stage, (count, total) in sorted(totals.items()):
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {count}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        by_name = defaultdict(list)
+        for (name, label), value in sorted(self.counters().items()):
+            by_name[name].append((label, value))
+        for name, values in by_name.items():
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            key = "stage" if name.startswith("llm_") else "kind"
+            for label, value in values:
+                labels = f'{{{key}="{label}"}}' if label else ""
+                lines.append(f"{p}_{name}_total{labels} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,139 @@
+# jd_profiles.py
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from ai_model import estimate_tokens, get_gemini_response
+from cache import AnalysisCache, DEFAULT_TTL_SECONDS, content_hash
+from instrumentation import metrics
+from parsing import extract_json
+from prescreen import SkillMatcher
+from utils import report_error
+
+# Prompt that turns a job description into a reusable profile; editing it invalidates stored profiles
+PROFILE_PROMPT = """
+    You are a data extraction specialist preparing a job description for resume screening.
+    Your response MUST contain ONLY a JSON object and no other text, with the following keys:
+    - "skills": A list of all key technical skills, programming languages, and tools mentioned in the job description.
+    - "requirements_summary": A condensed statement of the role's requirements in at most 150 words: responsibilities, must-have and nice-to-have skills, years of experience, education and any location or other constraints. Keep every concrete requirement and drop boilerplate such as company marketing and benefits.
+    """
+# Profiles whose compiled skill matcher is kept in memory
+DEFAULT_PROFILE_ENTRIES = 32
+# Profiles are stored in their own SQLite file next to the analysis cache
+PROFILE_CACHE_FILENAME = "jd_profiles.sqlite3"
+
+
+# Function to normalize a job description before hashing it
+def normalize_job_description(text):
+    """Unicode-normalizes and collapses whitespace, so re-pasting the same posting maps to the same profile."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+def profile_key(job_description):
+    return content_hash("jd-profile", normalize_job_description(job_description).casefold(), PROFILE_PROMPT)
+
+
+@dataclass
+class JobProfile:
+    """Preprocessed job description: skills, condensed requirements and a ready skill matcher."""
+    key: str
+    skills: list
+    requirements_summary: str = ""
+    created_at: float = 0.0
+    matcher: SkillMatcher = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.matcher is None:
+            self.matcher = SkillMatcher(self.skills)
+
+    def prompt_text(self, job_description):
+        """Job description to send with each resume: the condensed requirements when
+        they are shorter than the original, else the original."""
+        summary = self.requirements_summary.strip()
+        if summary and estimate_tokens(summary) < estimate_tokens(job_description):
+            return summary
+        return job_description
+
+    def to_dict(self):
+        return {"skills": self.skills, "requirements_summary": self.requirements_summary, "created_at": self.created_at}
+
+    @classmethod
+    def from_dict(cls, key, data):
+        return cls(key, list(data.get("skills") or []), data.get("requirements_summary") or "",
+                   data.get("created_at") or 0.0)
+
+
+# Function to create the local cache that persists profiles
+def profile_cache(analysis_cache_path, ttl=DEFAULT_TTL_SECONDS):
+    """Memory + SQLite cache for profiles, in the directory of `analysis_cache_path`
+    (memory only when that is None). Lookups are counted as `jd_profile`."""
+    path = os.path.join(os.path.dirname(analysis_cache_path), PROFILE_CACHE_FILENAME) if analysis_cache_path else None
+    return AnalysisCache(path=path, memory_entries=DEFAULT_PROFILE_ENTRIES, ttl=ttl, name="jd_profile")
+
+
+# Function to build a profile with one Gemini call
+def build_profile(job_description, on_error=None):
+    """Returns {'skills', 'requirements_summary', 'created_at'}; empty values if the call fails."""
+    profile = {"skills": [], "requirements_summary": "", "created_at": time.time()}
+    try:
+        response = get_gemini_response(PROFILE_PROMPT, job_description=job_description, stage="jd_profile")
+    except Exception as e:
+        report_error(f"Error extracting skills from job description: {e}", on_error)
+        return profile
+    with metrics.span("json_parse"):
+        parsed = extract_json(response)
+        if parsed is None:
+            # Fall back to a bare skills list
+            parsed = {"skills": extract_json(response, kind="array") or []}
+    skills = parsed.get("skills")
+    if isinstance(skills, list):
+        profile["skills"] = [s.strip() for s in skills if isinstance(s, str) and s.strip()]
+    summary = parsed.get("requirements_summary")
+    if isinstance(summary, str):
+        profile["requirements_summary"] = summary.strip()
+    return profile
+
+
+class JobProfileStore:
+    """Job-description profiles keyed by the hash of the normalized JD text.
+
+    Profiles are persisted in `cache` (see `profile_cache`, so they survive restarts
+    in its SQLite tier), which means a posting screened in several batches is
+    processed by Gemini once. The most recently used profiles stay in memory with
+    their compiled SkillMatcher.
+    """
+
+    def __init__(self, cache=None, max_entries=DEFAULT_PROFILE_ENTRIES):
+        self.cache = cache
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_description, on_error=None):
+        key = profile_key(job_description)
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+                metrics.incr("jd_profiles", label="memory_hits")
+                return profile
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is not None:
+            metrics.incr("jd_profiles", label="stored_hits")
+        else:
+            data = build_profile(job_description, on_error)
+            metrics.incr("jd_profiles", label="built")
+            # Failed extractions are not stored, so the next batch tries again
+            if self.cache is not None and data["skills"]:
+                self.cache.set(key, data)
+        profile = JobProfile.from_dict(key, data)
+        if profile.skills:
+            with self._lock:
+                self._profiles[key] = profile
+                while len(self._profiles) > self.max_entries:
+                    self._profiles.popitem(last=False)
+        return profile
@@ -0,0 +1,140 @@
+# local_db.py
+import re
+import sqlite3
+import threading
+import time
+
+# Tables the app uses, created on first access
+SCHEMAS = {
+    "users": "id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password_hash TEXT",
+    "analysis_history": (
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, filename TEXT, job_description TEXT, "
+        "resume_text TEXT, analysis_result TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP"
+    ),
+    "job_descriptions": "jd_hash TEXT PRIMARY KEY, job_description TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP",
+}
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _identifier(name):
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return name
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    """Subset of the supabase-py query builder: select/insert/upsert with eq/gt/lt/in_/order/limit."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = _identifier(table)
+        self._columns = "*"
+        self._rows = None
+        self._ignore_duplicates = False
+        self._where = []
+        self._params = []
+        self._order = ""
+        self._limit = ""
+
+    def select(self, columns="*"):
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        self._columns = "*" if names == ["*"] else ", ".join(_identifier(c) for c in names)
+        return self
+
+    def insert(self, rows):
+        self._rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        # Only the "do nothing on conflict" form is supported
+        self._ignore_duplicates = True
+        return self.insert(rows)
+
+    def _filter(self, column, op, value):
+        self._where.append(f"{_identifier(column)} {op} ?")
+        self._params.append(value)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def in_(self, column, values):
+        values = list(values)
+        self._where.append(f"{_identifier(column)} IN ({', '.join('?' * len(values)) or 'NULL'})")
+        self._params.extend(values)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = f" ORDER BY {_identifier(column)} {'DESC' if desc else 'ASC'}"
+        return self
+
+    def limit(self, count):
+        self._limit = f" LIMIT {int(count)}"
+        return self
+
+    def execute(self):
+        if self.db.latency:
+            time.sleep(self.db.latency)
+        if self._rows is not None:
+            return Response(self.db._insert(self.table, self._rows, self._ignore_duplicates))
+        where = f" WHERE {' AND '.join(self._where)}" if self._where else ""
+        sql = f"SELECT {self._columns} FROM {self.table}{where}{self._order}{self._limit}"
+        return Response(self.db._select(self.table, sql, self._params))
+
+
+class LocalSupabase:
+    """SQLite stand-in for the Supabase client, for offline runs and benchmarks.
+
+    `latency` adds a fixed delay per request to mimic a network round trip.
+    """
+
+    def __init__(self, path=":memory:", latency=0.0):
+        self.latency = latency
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._tables = set()
+
+    def table(self, name):
+        return Query(self, name)
+
+    def _ensure(self, table, columns=()):
+        if table not in self._tables:
+            schema = SCHEMAS.get(table, "id INTEGER PRIMARY KEY AUTOINCREMENT")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({schema})")
+            self._tables.add(table)
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {_identifier(column)}")
+
+    def _insert(self, table, rows, ignore_duplicates=False):
+        with self._lock:
+            columns = sorted({column for row in rows for column in row})
+            self._ensure(table, columns)
+            inserted = []
+            for row in rows:
+                names = [c for c in columns if c in row]
+                cursor = self._conn.execute(
+                    f"INSERT {'OR IGNORE ' if ignore_duplicates else ''}INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    [row[c] for c in names],
+                )
+                inserted.append(dict(row, id=cursor.lastrowid))
+            self._conn.commit()
+            return inserted
+
+    def _select(self, table, sql, params):
+        with self._lock:
+            self._ensure(table)
+            return [dict(row) for row in self._conn.execute(sql, params)]
@@ -0,0 +1,241 @@
+# parsing.py
+import json
+import re
+
+# Fields of the per-resume analysis and the type each one must have
+ANALYSIS_SCHEMA = {
+    "overall_score": int,
+    "summary_highlights": str,
+    "strengths": list,
+    "weaknesses": list,
+    "suggestions": list,
+    "found_skills": list,
+    "missing_skills": list,
+}
+# Fields worth showing while the rest of the response is still streaming in
+EARLY_FIELDS = ("overall_score", "summary_highlights")
+
+CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+OPENERS = {"{": "}", "[": "]"}
+
+
+def _scan(text, start):
+    """Returns the index just past the JSON value opened at `start`, or None if it never closes."""
+    stack = []
+    in_string = escape = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in OPENERS:
+            stack.append(OPENERS[c])
+        elif c in "}]":
+            if not stack or stack.pop() != c:
+                return None
+            if not stack:
+                return i + 1
+    return None
+
+
+# Function to pull the first JSON object/array out of an LLM response
+def extract_json(text, kind="object"):
+    """Returns the first balanced JSON object (or array) in `text`, repairing a truncated
+    tail if needed. Returns None when nothing usable is found.
+
+    Unlike a greedy `{.*}` regex, stray braces in surrounding prose do not swallow the
+    real payload.
+    """
+    if not text:
+        return None
+    text = CODE_FENCE.sub("", text)
+    opener = "{" if kind == "object" else "["
+    expected = dict if kind == "object" else list
+    position = text.find(opener)
+    while position != -1:
+        end = _scan(text, position)
+        candidate = text[position:end] if end else repair_json(text[position:])
+        if candidate is not None:
+            # Strict first, then without trailing commas
+            for attempt in (candidate, TRAILING_COMMA.sub(r"\1", candidate)):
+                try:
+                    value = json.loads(attempt)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(value, expected):
+                    return value
+                break
+        position = text.find(opener, position + 1)
+    return None
+
+
+# Function to close a truncated JSON document
+def repair_json(text):
+    """Closes a truncated document that starts with `{` or `[`.
+
+    Repair is deliberately limited: the document is cut back to its last complete
+    top-level member and closed. A member that may have been cut short (including a
+    number at the very end, e.g. 85 cut to 8) is dropped, so a truncated field reads
+    as missing rather than wrong. Returns None if `text` is not truncated.
+    """
+    stack = []
+    in_string = escape = False
+    boundary = 1
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in OPENERS:
+            stack.append(OPENERS[c])
+        elif c in "}]" and stack:
+            stack.pop()
+        elif c == "," and len(stack) == 1:
+            boundary = i
+    if not stack:
+        return None
+    closer = stack[0]
+    tail = text.rstrip().rstrip(",")
+    # The last member is complete only if it ends in something self-delimiting
+    if len(stack) == 1 and not in_string and tail[-1:] in ('"', "]", "}"):
+        try:
+            json.loads(tail + closer)
+            return tail + closer
+        except json.JSONDecodeError:
+            pass
+    return text[:boundary] + closer
+
+
+def _coerce(field, value):
+    expected = ANALYSIS_SCHEMA[field]
+    if expected is int:
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return max(0, min(100, int(round(value))))
+        match = re.match(r"\s*(\d+(?:\.\d+)?)", str(value))
+        return max(0, min(100, int(float(match.group(1))))) if match else None
+    if expected is list:
+        if isinstance(value, list):
+            return [str(item) for item in value if item is not None]
+        if isinstance(value, str) and value.strip():
+            return [value.strip()]
+        return None
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return str(value) if value is not None else None
+
+
+# Function to check an analysis against the schema
+def validate_analysis(analysis):
+    """Coerces known fields to their schema types.
+
+    Returns (analysis, missing) where `missing` lists required fields that are absent
+    or could not be coerced. Unknown extra fields are kept as-is.
+    """
+    if not isinstance(analysis, dict):
+        return {}, list(ANALYSIS_SCHEMA)
+    validated = dict(analysis)
+    missing = []
+    for field in ANALYSIS_SCHEMA:
+        value = _coerce(field, analysis[field]) if field in analysis else None
+        if value is None:
+            validated.pop(field, None)
+            missing.append(field)
+        else:
+            validated[field] = value
+    return validated, missing
+
+
+class StreamingObjectParser:
+    """Incrementally parses a streamed JSON object, emitting each top-level field as
+    soon as its value is complete.
+
+    `feed(chunk)` returns the fields completed by that chunk. Text before the first
+    `{` (such as a code fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._member_start = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        completed = {}
+        while self._position < len(self.buffer):
+            c = self.buffer[self._position]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._member_start = self._position + 1
+            elif self._depth == 0:
+                pass
+            elif c == '"':
+                self._in_string = True
+            elif c in OPENERS:
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._member(self.buffer[self._member_start:self._position], completed)
+            elif c == "," and self._depth == 1:
+                self._member(self.buffer[self._member_start:self._position], completed)
+                self._member_start = self._position + 1
+            self._position += 1
+        return completed
+
+    def _member(self, text, completed):
+        if not text.strip():
+            return
+        try:
+            member = json.loads("{" + text + "}")
+        except json.JSONDecodeError:
+            return
+        completed.update(member)
+        self.fields.update(member)
+
+    def result(self):
+        """Best-effort full object: the whole buffer if it parses (or repairs), else the fields seen so far."""
+        parsed = extract_json(self.buffer)
+        if isinstance(parsed, dict):
+            return dict(self.fields, **parsed)
+        return dict(self.fields)
+
+
+# Prompt asking the model for only the fields that were missing or invalid
+def missing_fields_prompt(missing):
+    fields = "\n".join(f'    - "{field}"' for field in missing)
+    return f"""
+    You are an experienced HR Manager comparing the provided resume with the job description.
+    A previous analysis was incomplete. Your response MUST contain ONLY a JSON object with exactly these keys:
+{fields}
+    Use the same meaning for each key as a standard resume analysis: "overall_score" is an integer out of 100,
+    list fields are lists of strings and "summary_highlights" is a concise 3-4 line explanation.
+    The resume and the job description follow below.
+    """
@@ -0,0 +1,127 @@
+# pdf_extraction.py
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+from cache import AnalysisCache, content_hash
+
+# Guards so huge or scanned files cannot stall the app
+DEFAULT_MAX_PAGES = 50
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+# Pages handed to one worker process at a time
+PAGES_PER_TASK = 16
+# Below this many pages in total, a process pool costs more than it saves
+PROCESS_POOL_MIN_PAGES = 64
+
+# Extracted text keyed by a hash of the PDF bytes
+text_cache = AnalysisCache(path=None, memory_entries=256, name="pdf_text")
+
+
+class PdfTooLargeError(ValueError):
+    """Raised when a PDF is over the configured byte limit."""
+
+
+def read_bytes(pdf_file):
+    """Returns the raw bytes of an uploaded file, a file object, a path or bytes."""
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def check_size(data, max_bytes=DEFAULT_MAX_BYTES):
+    if max_bytes and len(data) > max_bytes:
+        raise PdfTooLargeError(f"PDF is {len(data) / 1e6:.1f} MB, over the {max_bytes / 1e6:.0f} MB limit.")
+
+
+# Generator that yields the text of each page in turn
+def iter_pdf_pages(data, max_pages=DEFAULT_MAX_PAGES, start=0, stop=None):
+    """Yields page texts from `start` up to `stop` (or `max_pages`). Pages with no text yield ""."""
+    reader = PdfReader(io.BytesIO(data))
+    stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+    if max_pages:
+        stop = min(stop, max_pages)
+    for index in range(start, stop):
+        yield reader.pages[index].extract_text() or ""
+
+
+def count_pages(data, max_pages=DEFAULT_MAX_PAGES):
+    pages = len(PdfReader(io.BytesIO(data)).pages)
+    return min(pages, max_pages) if max_pages else pages
+
+
+def extract_text(data, max_pages=DEFAULT_MAX_PAGES, max_bytes=DEFAULT_MAX_BYTES):
+    """Extracts the text of one PDF in the current process, using the text cache."""
+    check_size(data, max_bytes)
+    key = content_hash("pdf-text", data, str(max_pages))
+    return text_cache.get_or_compute(key, lambda: "\n".join(iter_pdf_pages(data, max_pages)))
+
+
+def _extract_range(data, start, stop):
+    # Runs in a worker process; must stay importable without Streamlit
+    return list(iter_pdf_pages(data, max_pages=None, start=start, stop=stop))
+
+
+# Function to extract many PDFs, using a process pool when the work is large enough
+def extract_texts(documents, max_pages=DEFAULT_MAX_PAGES, max_bytes=DEFAULT_MAX_BYTES, max_workers=None):
+    """Extracts text from a list of PDF byte strings.
+
+    Returns one entry per document, in order: the text, or the exception raised for
+    that document. Long PDFs are split into page ranges so several processes can
+    work on one file.
+    """
+    results = [None] * len(documents)
+    tasks = []
+    keys = {}
+    for i, data in enumerate(documents):
+        try:
+            check_size(data, max_bytes)
+            key = content_hash("pdf-text", data, str(max_pages))
+            cached = text_cache.get(key)
+            if cached is not None:
+                results[i] = cached
+                continue
+            keys[i] = key
+            pages = count_pages(data, max_pages)
+            for start in range(0, pages, PAGES_PER_TASK):
+                tasks.append((i, start, min(start + PAGES_PER_TASK, pages)))
+        except Exception as e:
+            results[i] = e
+
+    total_pages = sum(stop - start for _, start, stop in tasks)
+    max_workers = max_workers or os.cpu_count() or 1
+    pages_by_doc = {i: [] for i in keys}
+    if max_workers > 1 and total_pages >= PROCESS_POOL_MIN_PAGES:
+        # "spawn" avoids forking a process that is running Streamlit's threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            futures = [(i, start, executor.submit(_extract_range, documents[i], start, stop)) for i, start, stop in tasks]
+            for i, start, future in futures:
+                try:
+                    pages_by_doc[i].append((start, future.result()))
+                except Exception as e:
+                    results[i] = e
+    else:
+        for i, start, stop in tasks:
+            if isinstance(results[i], Exception):
+                continue
+            try:
+                pages_by_doc[i].append((start, _extract_range(documents[i], start, stop)))
+            except Exception as e:
+                results[i] = e
+
+    for i, chunks in pages_by_doc.items():
+        if isinstance(results[i], Exception):
+            continue
+        text = "\n".join(page for _, pages in sorted(chunks, key=lambda chunk: chunk[0]) for page in pages)
+        results[i] = text
+        text_cache.set(keys[i], text)
+    return results
@@ -0,0 +1,149 @@
+# persistence.py
+import queue
+import random
+import threading
+import time
+
+from cache import content_hash
+from instrumentation import metrics
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def jd_hash(job_description):
+    return content_hash("jd", job_description or "")
+
+
+class WriteBehindWriter:
+    """Queues analysis rows and bulk-inserts them from a background thread.
+
+    Failed batches are retried with jittered exponential backoff; after
+    `max_attempts` they move to `dead_letters`. With `dedupe_job_descriptions`,
+    each row's `job_description` is replaced by a `jd_hash` and the text is written
+    once to `jd_table`, which needs this schema:
+
+        create table job_descriptions (jd_hash text primary key, job_description text);
+        alter table analysis_history add column jd_hash text;
+    """
+
+    def __init__(self, client, table="analysis_history", jd_table="job_descriptions",
+                 batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=0.5, max_delay=30.0,
+                 dedupe_job_descriptions=False):
+        self.client = client
+        self.table = table
+        self.jd_table = jd_table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dedupe_job_descriptions = dedupe_job_descriptions
+        self.dead_letters = []
+        self.last_error = None
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "retries": 0, "failed": 0, "jd_written": 0}
+        self._queue = queue.Queue()
+        self._known_jds = set()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        with self._idle:
+            return self._pending
+
+    def enqueue(self, row):
+        """Queues one row for insertion and returns immediately."""
+        with self._idle:
+            self._pending += 1
+            self.stats["enqueued"] += 1
+        self._queue.put(row)
+
+    def flush(self, timeout=None):
+        """Blocks until every queued row is written or dead-lettered. Returns True if drained."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            # Gather more rows for up to flush_interval, or until the batch is full
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._stopped = True
+                    break
+                batch.append(row)
+            self._write_with_retry(batch)
+
+    def _write_with_retry(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with metrics.span("db_insert", rows=len(batch)):
+                    self._write(batch)
+                metrics.incr("rows_written", len(batch))
+                with self._idle:
+                    self.stats["written"] += len(batch)
+                    self.stats["batches"] += 1
+                break
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    with self._idle:
+                        self.dead_letters.extend(batch)
+                        self.stats["failed"] += len(batch)
+                        self.last_error = e
+                    break
+                with self._idle:
+                    self.stats["retries"] += 1
+                metrics.incr("retries", label="db")
+                cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                time.sleep(cap / 2 + random.uniform(0, cap / 2))
+        with self._idle:
+            self._pending -= len(batch)
+            self._idle.notify_all()
+
+    def _write(self, batch):
+        rows = batch
+        if self.dedupe_job_descriptions:
+            new_jds = {}
+            rows = []
+            for row in batch:
+                row = dict(row)
+                text = row.pop("job_description", None)
+                if text is not None:
+                    row["jd_hash"] = jd_hash(text)
+                    if row["jd_hash"] not in self._known_jds:
+                        new_jds[row["jd_hash"]] = text
+                rows.append(row)
+            if new_jds:
+                self.client.table(self.jd_table).upsert(
+                    [{"jd_hash": h, "job_description": text} for h, text in new_jds.items()],
+                    on_conflict="jd_hash", ignore_duplicates=True,
+                ).execute()
+                self._known_jds.update(new_jds)
+                self.stats["jd_written"] += len(new_jds)
+        self.client.table(self.table).insert(rows).execute()
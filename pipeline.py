@@ -0,0 +1,181 @@
+# pipeline.py
+"""Headless screening pipeline: PDF extraction, skill pre-screen and Gemini analysis.
+
+Nothing here imports Streamlit, so it can run in batch jobs (see cli.py) as well
+as behind the app.
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai_model import (ANALYSIS_PROMPT_VERSION, DEFAULT_MODEL, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE,
+                      FakeBackend, GeminiBackend, GeminiClient, GeminiError, RateLimiter, get_analysis, set_client)
+from batch import run_batch, DEFAULT_MAX_CONCURRENCY
+from cache import AnalysisCache, analysis_cache_key, content_hash
+from config import get_setting
+from instrumentation import metrics
+from jd_profiles import PROFILE_PROMPT
+from pdf_extraction import read_bytes
+from prescreen import SkillMatcher
+from utils import get_pdf_text
+
+# Record statuses written for each resume
+STATUS_OK = "ok"
+STATUS_SCREENED_OUT = "screened_out"
+STATUS_ERROR = "error"
+# Statuses that count as done when resuming from a checkpoint; errors are retried
+FINAL_STATUSES = (STATUS_OK, STATUS_SCREENED_OUT)
+
+
+# Function to list the PDFs to screen under a directory
+def find_resumes(directory):
+    """Returns the paths of every .pdf file under `directory`, sorted for a stable order."""
+    paths = []
+    for root, _, names in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+# Canned analysis used by the dry-run backend
+def dry_run_responder(prompt):
+    if prompt.startswith(PROFILE_PROMPT.strip()):
+        return json.dumps({"skills": ["Python", "SQL", "Communication"],
+                           "requirements_summary": "Dry run: Python and SQL required."})
+    return json.dumps({
+        "overall_score": 50, "summary_highlights": "Dry run: no model was called.",
+        "strengths": [], "weaknesses": [], "suggestions": [], "found_skills": [], "missing_skills": [],
+    })
+
+
+# Function to install the shared Gemini client for this process
+def configure_client(backend="gemini", rate_share=1):
+    """Sets the process-wide client. `rate_share` divides the configured request and
+    token limits, so several worker processes together stay within the quota."""
+    if backend == "dry-run":
+        set_client(GeminiClient(FakeBackend(dry_run_responder)))
+        return
+    rpm = get_setting("GEMINI_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE, cast=int)
+    tpm = get_setting("GEMINI_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE, cast=int)
+    set_client(GeminiClient(
+        GeminiBackend(get_setting("GEMINI_MODEL", DEFAULT_MODEL)),
+        RateLimiter(max(1, rpm // rate_share), max(1, tpm // rate_share)),
+    ))
+
+
+class Screener:
+    """Screens resume files against one job description.
+
+    `job_description` is the text sent to Gemini with each resume (e.g. a JD
+    profile's condensed requirements); the content cache key is built from it.
+
+    `analyze(path)` returns a JSON-serializable record with the file name, the hash
+    of its bytes, content cache key, skill coverage, status and (when analyzed) the
+    analysis.
+    """
+
+    def __init__(self, job_description, job_skills=(), min_coverage=0, cache_path=None):
+        self.job_description = job_description
+        self.matcher = SkillMatcher(job_skills)
+        self.min_coverage = min_coverage
+        self.cache = AnalysisCache(path=cache_path) if cache_path else None
+
+    def cache_key(self, data):
+        return analysis_cache_key(data, self.job_description, ANALYSIS_PROMPT_VERSION)
+
+    def analyze(self, path):
+        start = time.perf_counter()
+        data = read_bytes(path)
+        record = {"filename": os.path.basename(path), "path": path, "resume_hash": content_hash(data),
+                  "cache_key": self.cache_key(data)}
+        errors = []
+        resume_text = get_pdf_text(data, on_error=errors.append)
+        if not resume_text:
+            record.update(status=STATUS_ERROR, error=errors[0] if errors else "No text could be extracted.")
+        else:
+            coverage = self.matcher.score(resume_text)["coverage"] if self.matcher.skills else None
+            record["skill_coverage"] = coverage
+            if coverage is not None and coverage < self.min_coverage:
+                record["status"] = STATUS_SCREENED_OUT
+            else:
+                self._analyze_text(record, resume_text)
+        record["elapsed"] = round(time.perf_counter() - start, 3)
+        return record
+
+    def _analyze_text(self, record, resume_text):
+        analysis = self.cache.get(record["cache_key"]) if self.cache else None
+        record["cached"] = analysis is not None
+        if analysis is None:
+            try:
+                analysis = get_analysis(resume_text, self.job_description)
+            except GeminiError as e:
+                record.update(status=STATUS_ERROR, error=str(e))
+                return
+            if self.cache and analysis and "raw_response" not in analysis and "missing_fields" not in analysis:
+                self.cache.set(record["cache_key"], analysis)
+        record.update(status=STATUS_OK, analysis=analysis)
+
+
+def _error_record(result):
+    path = result.item
+    return {"filename": os.path.basename(path), "path": path, "status": STATUS_ERROR, "error": str(result.error)}
+
+
+def _record_of(result):
+    return result.value if result.ok else _error_record(result)
+
+
+# Per-process state of the worker pool
+_worker = {}
+
+
+def _init_worker(settings):
+    configure_client(settings["backend"], settings["workers"])
+    _worker["screener"] = Screener(settings["job_description"], settings["job_skills"],
+                                   settings["min_coverage"], settings["cache_path"])
+    _worker["max_concurrency"] = settings["max_concurrency"]
+
+
+def _analyze_chunk(paths):
+    mark = metrics.mark()
+    results = run_batch(paths, _worker["screener"].analyze, max_concurrency=_worker["max_concurrency"])
+    return [_record_of(result) for result in results], metrics.snapshot(mark)
+
+
+# Function to screen many resumes, handing each record to `on_record` as soon as it is ready
+def run_pipeline(paths, job_description, on_record, job_skills=(), min_coverage=0, cache_path=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, workers=1, backend="gemini"):
+    """Screens every path and calls `on_record(record)` in completion order.
+
+    With `workers` > 1, paths are split into chunks of `max_concurrency` and spread
+    over that many spawned processes, each running `max_concurrency` threads and an
+    equal share of the rate limits; their timings are merged into this process's
+    metrics registry. Returns the number of records produced.
+    """
+    paths = list(paths)
+    if workers <= 1:
+        configure_client(backend)
+        screener = Screener(job_description, job_skills, min_coverage, cache_path)
+        run_batch(paths, screener.analyze, max_concurrency=max_concurrency,
+                  on_progress=lambda done, total, result: on_record(_record_of(result)))
+        return len(paths)
+
+    settings = {"backend": backend, "workers": workers, "job_description": job_description,
+                "job_skills": list(job_skills), "min_coverage": min_coverage, "cache_path": cache_path,
+                "max_concurrency": max_concurrency}
+    chunk_size = max(1, max_concurrency)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(settings,)) as executor:
+        futures = {executor.submit(_analyze_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                records, snapshot = future.result()
+                metrics.merge(snapshot)
+            except Exception as e:
+                records = [{"filename": os.path.basename(path), "path": path, "status": STATUS_ERROR, "error": str(e)}
+                           for path in futures[future]]
+            for record in records:
+                on_record(record)
+    return len(paths)
@@ -0,0 +1,141 @@
+# prescreen.py
+import re
+
+# Common alternate spellings, mapped to the canonical skill name
+SKILL_SYNONYMS = {
+    "javascript": ["js", "ecmascript"],
+    "typescript": ["ts"],
+    "kubernetes": ["k8s"],
+    "postgresql": ["postgres", "psql"],
+    "go": ["golang"],
+    "machine learning": ["ml"],
+    "artificial intelligence": ["ai"],
+    "natural language processing": ["nlp"],
+    "amazon web services": ["aws"],
+    "google cloud platform": ["gcp", "google cloud"],
+    "microsoft azure": ["azure"],
+    "node.js": ["nodejs", "node"],
+    "react": ["react.js", "reactjs"],
+    "vue": ["vue.js", "vuejs"],
+    "c#": ["csharp", "c sharp"],
+    "c++": ["cpp"],
+    ".net": ["dotnet"],
+    "ci/cd": ["cicd", "continuous integration"],
+    "rest api": ["rest", "restful", "rest apis", "restful api"],
+}
+# Surface forms this short are matched case-sensitively ("Go", "R", "C"), so they do
+# not fire on ordinary words like "go" or on stray single letters.
+CASE_SENSITIVE_MAX_LENGTH = 2
+# Characters that may not touch a match on either side
+WORD_CHARS = r"\w+#"
+# Separators that may have spaces around them in text ("CI / CD", "Node . js")
+SEPARATORS = "/.-"
+
+
+def normalize_skill(skill):
+    """Lowercases and collapses whitespace/separators in a skill name."""
+    skill = re.sub(r"\s+", " ", str(skill)).strip().lower()
+    return re.sub(r"\s*([/.\-])\s*", r"\1", skill)
+
+
+def synonym_groups(synonyms=SKILL_SYNONYMS):
+    """Maps every normalized name in `synonyms` to its whole group (canonical name and aliases)."""
+    groups = {}
+    for name, alts in synonyms.items():
+        group = {normalize_skill(form) for form in [name, *alts]}
+        for form in group:
+            groups.setdefault(form, set()).update(group)
+    return groups
+
+
+def _trie_pattern(words):
+    # Build a regex from a character trie so shared prefixes are matched once.
+    # Separators inside a word also match with spaces around them, the way
+    # normalize_skill reads them on the skill side.
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render_char(char, inner):
+        if char in SEPARATORS and inner:
+            return r"\s*" + re.escape(char) + r"\s*"
+        return re.escape(char)
+
+    def render(node, inner=False):
+        children = [render_char(char, inner) + render(node[char], True) for char in sorted(k for k in node if k)]
+        if not children:
+            return ""
+        body = children[0] if len(children) == 1 else "(?:" + "|".join(children) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return render(trie)
+
+
+class SkillMatcher:
+    """Normalized skill index that scores resume text against a JD's skill list."""
+
+    def __init__(self, skills, synonyms=SKILL_SYNONYMS):
+        self.skills = []
+        self.forms = {}
+        groups = synonym_groups(synonyms)
+        for skill in skills or []:
+            canonical = normalize_skill(skill)
+            if not canonical or canonical in self.skills:
+                continue
+            self.skills.append(canonical)
+            self.forms[canonical] = canonical
+            # Any name in the skill's synonym group counts, whichever one the JD used
+            for alias in sorted(groups.get(canonical, ())):
+                self.forms.setdefault(alias, canonical)
+        self._display = {normalize_skill(s): str(s).strip() for s in skills or []}
+        self._case_sensitive = {}
+        insensitive = []
+        for form in self.forms:
+            if len(form) <= CASE_SENSITIVE_MAX_LENGTH:
+                for variant in {form.upper(), form.capitalize()}:
+                    self._case_sensitive[variant] = self.forms[form]
+            else:
+                insensitive.append(form)
+        self._patterns = []
+        if insensitive:
+            self._patterns.append(self._compile(insensitive, re.IGNORECASE))
+        if self._case_sensitive:
+            self._patterns.append(self._compile(self._case_sensitive, 0))
+
+    def _compile(self, forms, flags):
+        return re.compile(rf"(?<![{WORD_CHARS}])({_trie_pattern(forms)})(?![{WORD_CHARS}]|\.\w)", flags)
+
+    def match(self, text):
+        """Returns the set of canonical skills found in `text`."""
+        text = re.sub(r"\s+", " ", text)
+        found = set()
+        for pattern in self._patterns:
+            for m in pattern.finditer(text):
+                form = m.group(1)
+                found.add(self._case_sensitive.get(form) or self.forms.get(form.lower()) or self.forms.get(normalize_skill(form)))
+        found.discard(None)
+        return found
+
+    def score(self, text):
+        """Returns {'coverage': 0-100, 'matched': [...], 'missing': [...]} for one resume."""
+        found = self.match(text or "")
+        matched = [self._display.get(s, s) for s in self.skills if s in found]
+        missing = [self._display.get(s, s) for s in self.skills if s not in found]
+        coverage = round(100 * len(matched) / len(self.skills)) if self.skills else 0
+        return {'coverage': coverage, 'matched': matched, 'missing': missing}
+
+
+# Function to decide which resumes are worth an LLM call
+def select_candidates(coverages, top_k=None, min_coverage=0):
+    """Returns the indexes (in input order) of resumes that pass the pre-screen.
+
+    A resume passes when its coverage is at least `min_coverage` and, if `top_k` is
+    set, it is among the `top_k` highest-coverage resumes (ties keep input order).
+    """
+    passing = [i for i, coverage in enumerate(coverages) if coverage >= (min_coverage or 0)]
+    if top_k:
+        passing = sorted(passing, key=lambda i: -coverages[i])[:top_k]
+    return sorted(passing)
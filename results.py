@@ -0,0 +1,111 @@
+# results.py
+import bisect
+import json
+from collections import defaultdict
+
+from cache import content_hash
+
+
+def entry_key(entry):
+    """Stable key for a history entry: its content cache key, or a hash of the stored result."""
+    return entry.get('cache_key') or content_hash(entry.get('filename'), str(entry.get('analysis_result')))
+
+
+# Function to parse one history entry into a display-ready analysis
+def parse_entry(entry):
+    """Returns the analysis dict (with 'filename') for a history entry, or None if it cannot be parsed."""
+    analysis = entry.get('analysis_result')
+    if isinstance(analysis, str):
+        try:
+            analysis = json.loads(analysis)
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(analysis, dict):
+        return None
+    analysis = dict(analysis)
+    analysis['filename'] = entry.get('filename')
+    return analysis
+
+
+def score_of(analysis):
+    score = analysis.get('overall_score', 0)
+    return score if isinstance(score, (int, float)) else 0
+
+
+class ResultsIndex:
+    """Parsed analyses plus score and skill indexes, built incrementally from the history.
+
+    Analyses are indexed by content key; when several history entries share a key
+    (the same resume screened again), the newest one wins. History is append-only
+    between clears, so `sync` only parses entries it has not seen; a new or shorter
+    history list triggers a rebuild.
+    """
+
+    def __init__(self):
+        self._reset(None)
+
+    def _reset(self, source):
+        self._source = source
+        self._count = 0
+        self.entry_keys = []
+        self.by_key = {}
+        self.failed = set()
+        self._scores = []
+        self._by_skill = defaultdict(set)
+
+    def sync(self, history):
+        if history is not self._source or len(history) < self._count:
+            self._reset(history)
+        for entry in history[self._count:]:
+            self.entry_keys.append(self.add(entry))
+        self._count = len(history)
+        return self
+
+    def add(self, entry):
+        key = entry_key(entry)
+        analysis = parse_entry(entry)
+        if analysis is None:
+            self.failed.add(key)
+            return None
+        self.failed.discard(key)
+        self._discard(key)
+        self.by_key[key] = analysis
+        bisect.insort(self._scores, (score_of(analysis), key))
+        for skill in analysis.get('found_skills') or []:
+            self._by_skill[skill].add(key)
+        return key
+
+    def _discard(self, key):
+        analysis = self.by_key.pop(key, None)
+        if analysis is None:
+            return
+        i = bisect.bisect_left(self._scores, (score_of(analysis), key))
+        if i < len(self._scores) and self._scores[i] == (score_of(analysis), key):
+            del self._scores[i]
+        for skill in analysis.get('found_skills') or []:
+            self._by_skill[skill].discard(key)
+
+    def get(self, key):
+        return self.by_key.get(key)
+
+    def parsed_history(self):
+        """(history entry, parsed analysis or None) pairs, in history order."""
+        return [(entry, self.by_key.get(key)) for entry, key in zip(self._source or [], self.entry_keys)]
+
+    def query(self, score_range=(0, 100), skills=(), keys=None):
+        """Analyses with a score in `score_range` that list every skill in `skills`,
+        optionally limited to `keys`, sorted by score (highest first)."""
+        low = bisect.bisect_left(self._scores, (score_range[0],))
+        high = bisect.bisect_left(self._scores, (score_range[1], chr(0x10FFFF)))
+        allowed = keys
+        for skill in skills:
+            matching = self._by_skill.get(skill, set())
+            allowed = matching if allowed is None else allowed & matching
+        results = []
+        for score, key in reversed(self._scores[low:high]):
+            if allowed is None or key in allowed:
+                results.append(self.by_key[key])
+        return results
+
+    def __len__(self):
+        return len(self.by_key)
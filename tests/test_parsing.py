@@ -0,0 +1,119 @@
+# tests/test_parsing.py
+import json
+
+from parsing import ANALYSIS_SCHEMA, StreamingObjectParser, extract_json, repair_json, validate_analysis
+
+
+def full_analysis(**overrides):
+    analysis = {"overall_score": 85, "summary_highlights": "Strong backend fit.", "strengths": ["Python"],
+                "weaknesses": ["No Go"], "suggestions": ["Add metrics"], "found_skills": ["Python", "SQL"],
+                "missing_skills": ["Go"]}
+    analysis.update(overrides)
+    return analysis
+
+
+def feed_in_chunks(text, size):
+    parser = StreamingObjectParser()
+    seen = {}
+    for i in range(0, len(text), size):
+        seen.update(parser.feed(text[i:i + size]))
+    return parser, seen
+
+
+def test_truncated_number_is_dropped_not_guessed():
+    # 85 cut to 8 must read as missing, not as a score of 8
+    assert repair_json('{"summary_highlights": "ok", "overall_score": 8') == '{"summary_highlights": "ok"}'
+    assert extract_json('{"summary_highlights": "ok", "overall_score": 8') == {"summary_highlights": "ok"}
+
+
+def test_complete_last_member_is_kept():
+    assert extract_json('{"overall_score": 85, "strengths": ["a", "b"]') == {"overall_score": 85, "strengths": ["a", "b"]}
+
+
+def test_string_cut_inside_a_list_drops_the_whole_member():
+    parsed = extract_json('{"overall_score": 80, "strengths": ["Python", "Dja')
+    assert parsed == {"overall_score": 80}
+
+
+def test_untruncated_text_is_not_repaired():
+    assert repair_json('{"overall_score": 80}') is None
+
+
+def test_braces_inside_strings_and_prose():
+    text = 'Note {see below}: {"summary_highlights": "uses {braces} and }", "overall_score": 5} done }'
+    assert extract_json(text) == {"summary_highlights": "uses {braces} and }", "overall_score": 5}
+
+
+def test_escaped_quotes_do_not_end_strings():
+    text = '{"summary_highlights": "said \\"hi\\" {", "overall_score": 7}'
+    assert extract_json(text) == {"summary_highlights": 'said "hi" {', "overall_score": 7}
+
+
+def test_trailing_commas():
+    assert extract_json('{"strengths": ["a", "b",], "overall_score": 70,}') == {"strengths": ["a", "b"], "overall_score": 70}
+
+
+def test_code_fences():
+    assert extract_json('```json\n{"overall_score": 5}\n```') == {"overall_score": 5}
+    assert extract_json('```\n["Python", "SQL"]\n```', kind="array") == ["Python", "SQL"]
+
+
+def test_array_kind_skips_objects():
+    assert extract_json('Skills: ["Python", "SQL"]', kind="array") == ["Python", "SQL"]
+    assert extract_json('{"a": 1}', kind="array") is None
+
+
+def test_nothing_usable():
+    assert extract_json("") is None
+    assert extract_json("no json here") is None
+
+
+def test_streaming_emits_each_field_once_complete():
+    parser = StreamingObjectParser()
+    assert parser.feed('```json\n{"overall_score": 8') == {}
+    assert parser.feed('5, "summary_highlights": "Go') == {"overall_score": 85}
+    assert parser.feed('od fit", "strengths": ["a"') == {"summary_highlights": "Good fit"}
+    assert parser.feed(']}\n```') == {"strengths": ["a"]}
+    assert parser.result() == {"overall_score": 85, "summary_highlights": "Good fit", "strengths": ["a"]}
+
+
+def test_streaming_chunk_boundaries_inside_escapes():
+    analysis = full_analysis(summary_highlights='He said "ship it", then \\ left {early}.')
+    text = json.dumps(analysis)
+    for size in (1, 2, 3, 7):
+        parser, seen = feed_in_chunks(text, size)
+        assert seen == analysis
+        assert parser.result() == analysis
+
+
+def test_streaming_result_of_truncated_stream():
+    text = json.dumps(full_analysis())
+    parser, seen = feed_in_chunks(text[:text.index('"found_skills"') + 20], 5)
+    result = parser.result()
+    assert "found_skills" not in result
+    assert result["overall_score"] == 85 and result["suggestions"] == ["Add metrics"]
+
+
+def test_score_coercion():
+    for raw, expected in (("85/100", 85), ("85", 85), (85.6, 86), ("92.5%", 92), (150, 100), (-3, 0)):
+        analysis, missing = validate_analysis(full_analysis(overall_score=raw))
+        assert analysis["overall_score"] == expected and missing == []
+    for raw in (True, "high", None):
+        analysis, missing = validate_analysis(full_analysis(overall_score=raw))
+        assert "overall_score" not in analysis and missing == ["overall_score"]
+
+
+def test_list_and_string_coercion():
+    analysis, missing = validate_analysis(full_analysis(strengths="Python", summary_highlights=["a", "b"],
+                                                        weaknesses=[None, 3], suggestions=""))
+    assert analysis["strengths"] == ["Python"]
+    assert analysis["summary_highlights"] == "a b"
+    assert analysis["weaknesses"] == ["3"]
+    assert missing == ["suggestions"]
+
+
+def test_validate_reports_missing_fields_and_keeps_extras():
+    analysis, missing = validate_analysis({"overall_score": 50, "extra": 1})
+    assert analysis == {"overall_score": 50, "extra": 1}
+    assert missing == [field for field in ANALYSIS_SCHEMA if field != "overall_score"]
+    assert validate_analysis("not a dict") == ({}, list(ANALYSIS_SCHEMA))
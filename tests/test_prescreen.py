@@ -0,0 +1,43 @@
+# tests/test_prescreen.py
+import pytest
+
+from prescreen import SkillMatcher, select_candidates
+
+
+@pytest.mark.parametrize("skill, text", [
+    ("REST APIs", "Built RESTful services"),
+    ("REST APIs", "Designed a REST API gateway"),
+    ("rest api", "Exposed RESTful endpoints"),
+    ("Golang", "Go and Python"),
+    ("K8s", "Ran Kubernetes clusters"),
+])
+def test_synonyms_match_across_the_whole_group(skill, text):
+    assert SkillMatcher([skill]).score(text)["coverage"] == 100
+
+
+@pytest.mark.parametrize("text", ["CI / CD pipelines", "CI/ CD", "ci /cd", "CI/CD"])
+def test_spaced_separators_in_text(text):
+    assert SkillMatcher(["CI/CD"]).match(text) == {"ci/cd"}
+
+
+def test_spaced_dots_and_sentence_ends():
+    matcher = SkillMatcher(["Node.js", "Python", "Java"])
+    assert matcher.match("Node . js services") == {"node.js"}
+    # A sentence ending right after a skill still counts for that skill
+    assert matcher.match("Python. Java") == {"python", "java"}
+
+
+def test_short_forms_are_case_sensitive():
+    matcher = SkillMatcher(["Go"])
+    assert matcher.match("I go home") == set()
+    assert matcher.match("Wrote Go services") == {"go"}
+
+
+def test_score_reports_display_names():
+    result = SkillMatcher(["Python", "SQL", "Docker"]).score("Python and SQL")
+    assert result == {"coverage": 67, "matched": ["Python", "SQL"], "missing": ["Docker"]}
+
+
+def test_select_candidates():
+    assert select_candidates([10, 80, 50, 80], top_k=2) == [1, 3]
+    assert select_candidates([10, 80, 50], min_coverage=50) == [1, 2]
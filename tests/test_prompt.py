@@ -0,0 +1,70 @@
+# tests/test_prompt.py
+import pytest
+
+from ai_model import ANALYSIS_PROMPT, TRIM_MARKER, build_prompt, estimate_tokens
+
+RESUME = "\n".join(f"Experience {i}: built Python and SQL services   for team {i}." for i in range(400))
+JOB_DESCRIPTION = "Senior Backend Engineer. 5+ years Python, SQL, AWS and Docker. " * 20
+DOCUMENTS = [("Resume", RESUME), ("Job Description", JOB_DESCRIPTION)]
+INSTRUCTION_TOKENS = estimate_tokens(ANALYSIS_PROMPT.strip())
+# Per document, a trimmed prompt always carries its label and the trim marker
+DOCUMENT_OVERHEAD = max(estimate_tokens(f"\n\n{label}:\n" + TRIM_MARKER.format(count=10 ** 6)) for label, _ in DOCUMENTS)
+
+
+def legacy_prompt(resume_text, job_description):
+    # Old shape: documents embedded in the instructions, then appended again
+    return (f"{ANALYSIS_PROMPT}\nHere is the Resume: {resume_text}\nHere is the Job Description: {job_description}"
+            f"\n\nResume: {resume_text}\n\nJob Description: {job_description}")
+
+
+def test_each_document_appears_exactly_once():
+    marker_resume = "UNIQUE-RESUME-MARKER " + RESUME
+    marker_jd = "UNIQUE-JD-MARKER " + JOB_DESCRIPTION
+    prompt = build_prompt(ANALYSIS_PROMPT, [("Resume", marker_resume), ("Job Description", marker_jd)], None)
+    assert prompt.count("UNIQUE-RESUME-MARKER") == 1
+    assert prompt.count("UNIQUE-JD-MARKER") == 1
+    assert prompt.count("Resume:\n") == 1
+    assert prompt.count("Job Description:\n") == 1
+    assert prompt.startswith(ANALYSIS_PROMPT.strip())
+
+
+def test_empty_documents_are_skipped():
+    prompt = build_prompt(ANALYSIS_PROMPT, [("Resume", RESUME), ("Job Description", "")], None)
+    assert "Job Description:\n" not in prompt
+
+
+def test_prompt_is_smaller_than_the_legacy_doubled_prompt():
+    legacy = legacy_prompt(RESUME, JOB_DESCRIPTION)
+    prompt = build_prompt(ANALYSIS_PROMPT, DOCUMENTS, None)
+    assert len(prompt) < len(legacy)
+    assert estimate_tokens(prompt) < estimate_tokens(legacy) * 0.6
+
+
+@pytest.mark.parametrize("budget", [400, 600, 1000, 2500, 5000])
+def test_token_budget_is_respected(budget):
+    prompt = build_prompt(ANALYSIS_PROMPT, DOCUMENTS, budget)
+    assert estimate_tokens(prompt) <= budget
+    # Budget is used, not thrown away
+    assert estimate_tokens(prompt) >= budget * 0.9
+
+
+@pytest.mark.parametrize("budget", [0, 10, INSTRUCTION_TOKENS // 2, INSTRUCTION_TOKENS])
+def test_budget_smaller_than_the_instructions(budget):
+    prompt = build_prompt(ANALYSIS_PROMPT, DOCUMENTS, budget)
+    # Instructions are never cut; documents shrink to their label and the trim marker
+    assert prompt.startswith(ANALYSIS_PROMPT.strip())
+    assert prompt.count("Resume:\n") == 1 and prompt.count("Job Description:\n") == 1
+    assert estimate_tokens(prompt) <= INSTRUCTION_TOKENS + len(DOCUMENTS) * DOCUMENT_OVERHEAD
+
+
+def test_short_documents_hand_their_share_to_long_ones():
+    short_jd = "Python developer."
+    prompt = build_prompt(ANALYSIS_PROMPT, [("Resume", RESUME), ("Job Description", short_jd)], 1500)
+    assert prompt.endswith(short_jd)
+    assert estimate_tokens(prompt) >= 1500 * 0.9
+
+
+def test_no_budget_keeps_the_whole_document():
+    prompt = build_prompt(ANALYSIS_PROMPT, DOCUMENTS, None)
+    assert "trimmed to fit" not in prompt
+    assert "Experience 399" in prompt
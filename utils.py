@@ -1,43 +1,40 @@
 # utils.py
-from PyPDF2 import PdfReader
-import streamlit as st
-import json
-import re
+import logging
 
-# We need to import the AI function to use it here
-from ai_model import get_gemini_response
+from instrumentation import metrics
+from pdf_extraction import extract_text, extract_texts, read_bytes, PdfTooLargeError
+
+logger = logging.getLogger(__name__)
+
+# Function to report a user-facing error: shown by the caller's callback (e.g. st.error), else logged
+def report_error(message, on_error=None):
+    if on_error is not None:
+        on_error(message)
+    else:
+        logger.error(message)
 
 # Function to extract text from a PDF file
-def get_pdf_text(pdf_file):
-    """Extracts text from a single PDF file with improved error handling."""
+def get_pdf_text(pdf_file, on_error=None):
+    """Extracts text from a single PDF file (upload, path or bytes) with improved error handling."""
     try:
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += str(page.extract_text())
-        return text
+        with metrics.span("pdf_extraction"):
+            return extract_text(read_bytes(pdf_file))
+    except PdfTooLargeError as e:
+        report_error(f"Skipping {getattr(pdf_file, 'name', 'PDF')}: {e}", on_error)
+        return ""
     except Exception as e:
-        st.error(f"Error reading PDF file: {e}. Please ensure it is not corrupted or password-protected.")
+        report_error(f"Error reading PDF file: {e}. Please ensure it is not corrupted or password-protected.", on_error)
         return ""
 
-# Function to get skills from the job description
-def get_job_description_skills(job_description):
-    """Extracts a list of key skills from a job description using the AI."""
-    prompt = f"""
-    You are a data extraction specialist. Your task is to extract a list of all key technical skills, programming languages, and tools mentioned in the job description.
-    
-    The output should be a single JSON list of strings. Do not include any other text.
-    
-    Job Description:
-    {job_description}
+# Function to warm the text cache for a whole upload at once
+def prefetch_pdf_texts(pdf_files):
+    """Extracts every file up front, in worker processes when the batch is large.
+
+    Returns one entry per file: the text, or the exception raised for it. Errors are
+    not reported here; get_pdf_text reports them per file afterwards.
     """
     try:
-        response = get_gemini_response(prompt, "", "")
-        json_match = re.search(r'\[.*\]', response, re.DOTALL)
-        if json_match:
-            json_string = json_match.group(0)
-            return json.loads(json_string)
-        return []
+        with metrics.span("pdf_prefetch", files=len(pdf_files)):
+            return extract_texts([read_bytes(f) for f in pdf_files])
     except Exception as e:
-        st.error(f"Error extracting skills from job description: {e}")
-        return []
\ No newline at end of file
+        return [e] * len(pdf_files)